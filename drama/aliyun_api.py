@@ -7,6 +7,8 @@
 import os
 import json
 import time
+import shutil
+import hashlib
 import asyncio
 import aiohttp
 import subprocess
@@ -21,6 +23,7 @@ BASE_URL = "https://dashscope.aliyuncs.com/api/v1"
 MODELS = {
     "text": "qwen-max",
     "image": "wan2.6-t2i", 
+    "image_ref": "wan2.6-image",  # 支持参考图输入 (t2i只接受文本)
     "tts": "cosyvoice-v3-plus"
 }
 
@@ -61,19 +64,39 @@ class AliyunAPI:
         response = self._request(url, payload)
         return response["output"]["choices"]["message"]["content"]
     
-    def generate_image(self, prompt: str, size: str = "720*1280") -> str:
-        """单张图片生成 (万相) - 异步"""
+    def generate_image(self, prompt: str, size: str = "720*1280",
+                       seed: int = None, ref_image: str = None) -> str:
+        """单张图片生成 (万相) - 异步
+        
+        Args:
+            seed: 固定种子 (同一角色复用同一种子)
+            ref_image: 参考图 (URL或本地路径)，用于保持角色外貌一致；
+                带参考图的请求走image_ref模型，失败时退回纯文本生成
+        """
+        if ref_image:
+            try:
+                return self._generate_image(MODELS["image_ref"], prompt, size, seed, ref_image)
+            except Exception as e:
+                print(f"  ⚠️ 参考图生成失败，改为纯文本生成: {e}")
+        return self._generate_image(MODELS["image"], prompt, size, seed)
+    
+    def _generate_image(self, model: str, prompt: str, size: str,
+                        seed: int = None, ref_image: str = None) -> str:
+        """提交图片生成任务并等待结果URL"""
         url = f"{BASE_URL}/services/aigc/image-generation/generation"
         
+        content = []
+        if ref_image:
+            content.append({"image": image_input(ref_image)})
+        content.append({"text": prompt})
+        
         payload = {
-            "model": MODELS["image"],
+            "model": model,
             "input": {
                 "messages": [
                     {
                         "role": "user",
-                        "content": [
-                            {"text": prompt}
-                        ]
+                        "content": content
                     }
                 ]
             },
@@ -83,6 +106,8 @@ class AliyunAPI:
                 "prompt_extend": True
             }
         }
+        if seed is not None:
+            payload["parameters"]["seed"] = seed
         
         # 提交任务
         task_id = self._submit_task(url, payload)
@@ -91,8 +116,14 @@ class AliyunAPI:
         return self._wait_for_task(task_id)
     
     def generate_images_parallel(self, prompts: List[str], size: str = "720*1280", 
-                                  batch_size: int = 6) -> List[str]:
-        """并行生成多张图片 (分批避免QPS限制)"""
+                                  batch_size: int = 6, seeds: List[int] = None,
+                                  ref_images: List[str] = None) -> List[str]:
+        """并行生成多张图片 (分批避免QPS限制)
+        
+        seeds / ref_images 与prompts一一对应 (可为None)
+        """
+        seeds = seeds or [None] * len(prompts)
+        ref_images = ref_images or [None] * len(prompts)
         results = []
         
         # 分批处理
@@ -103,7 +134,10 @@ class AliyunAPI:
             # 本批次内并行
             batch_results = []
             with ThreadPoolExecutor(max_workers=3) as executor:
-                futures = [executor.submit(self.generate_image, p, size) for p in batch]
+                futures = [
+                    executor.submit(self.generate_image, p, size, seeds[i + j], ref_images[i + j])
+                    for j, p in enumerate(batch)
+                ]
                 for future in futures:
                     try:
                         result = future.result()
@@ -120,8 +154,22 @@ class AliyunAPI:
         
         return results
     
-    def generate_tts(self, text: str, voice: str = "xiaoyun", output_path: str = None) -> str:
-        """TTS语音合成 - 使用gTTS作为后备"""
+    def generate_tts(self, text: str, voice: str = "xiaoyun", output_path: str = None,
+                     cache_dir: str = None) -> str:
+        """TTS语音合成 - 使用gTTS作为后备
+
+        指定cache_dir时按(音色, 文本)跨集复用已合成的音频，仅缓存阿里云成功结果
+        """
+        if output_path is None:
+            output_path = f"/tmp/tts_{int(time.time())}.mp3"
+        
+        cache_path = None
+        if cache_dir:
+            cache_path = os.path.join(cache_dir, f"{tts_cache_key(text, voice)}.mp3")
+            if os.path.exists(cache_path):
+                shutil.copyfile(cache_path, output_path)
+                return output_path
+        
         try:
             url = f"{BASE_URL}/services/aigc/speech-generation/t2a"
             
@@ -143,14 +191,15 @@ class AliyunAPI:
             return self._generate_tts_gtts(text, output_path)
         
         # 保存音频
-        if output_path is None:
-            output_path = f"/tmp/tts_{int(time.time())}.mp3"
-        
         audio_data = response["output"]["audio"]
         import base64
         with open(output_path, "wb") as f:
             f.write(base64.b64decode(audio_data))
         
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            shutil.copyfile(output_path, cache_path)
+        
         return output_path
     
     def _generate_tts_gtts(self, text: str, output_path: str = None) -> str:
@@ -280,17 +329,44 @@ class AliyunAPI:
         raise Exception("任务超时")
 
 
-def get_voice_for_gender(gender: str) -> str:
-    """根据性别获取TTS音色"""
+def image_input(ref: str) -> str:
+    """参考图转为API输入: URL原样返回，本地文件转为base64 data URI"""
+    if ref.startswith(("http://", "https://", "data:")):
+        return ref
+    import base64
+    ext = os.path.splitext(ref)[1].lstrip(".").lower() or "jpeg"
+    if ext == "jpg":
+        ext = "jpeg"
+    with open(ref, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    return f"data:image/{ext};base64,{encoded}"
+
+
+def get_voice_for_gender(gender: str, name: str = "", taken=()) -> str:
+    """根据性别获取TTS音色
+
+    同一角色名总是映射到同一音色 (按名字哈希选取，跨进程稳定)；
+    taken中的音色会被跳过，音色池用尽时才允许重复
+    """
     gender = gender.lower()
     if gender in ["男", "male", "m"]:
-        import random
-        return random.choice(TTS_VOICES["male"])
+        pool = TTS_VOICES["male"]
     elif gender in ["女", "female", "f"]:
-        import random
-        return random.choice(TTS_VOICES["female"])
+        pool = TTS_VOICES["female"]
     else:
         return TTS_VOICES["default"]
+    start = int(hashlib.md5(name.encode("utf-8")).hexdigest(), 16) % len(pool)
+    for offset in range(len(pool)):
+        voice = pool[(start + offset) % len(pool)]
+        if voice not in taken:
+            return voice
+    return pool[start]
+
+
+def tts_cache_key(text: str, voice: str) -> str:
+    """TTS缓存键: 模型 + 音色 + 文本"""
+    raw = f"{MODELS['tts']}|{voice}|{text}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+角色资产库
+每个角色固定一次: 种子 + 外貌提示词片段 + 参考图，
+并缓存 (角色, 场景) 的基准帧，后续镜头以其为参考图生成，保持人物一致。
+基准帧拷贝到资产目录 (assets.json同级的base_frames/)，不指向会被重跑覆盖的分集输出
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+ASSETS_FILE = '/home/li/.openclaw/workspace/drama/universe/assets.json'
+
+# 外貌字段拼接顺序
+APPEARANCE_FIELDS = ["face", "hair", "build", "costume"]
+
+
+def stable_seed(key: str) -> int:
+    """根据角色ID生成稳定种子 (跨进程不变)"""
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest(), 16) % (2 ** 31)
+
+
+class CharacterAssets:
+    """角色资产 (存于 assets.json 的 characters / base_frames 字段)"""
+
+    def __init__(self, path: str = ASSETS_FILE):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.data = json.load(f)
+        self.data.setdefault("characters", {})
+        self.data.setdefault("base_frames", {})
+        self.frames_dir = os.path.join(os.path.dirname(path), "base_frames")
+        self._dirty = False
+        # 旧版记录直接指向分集输出: 趁本次生成覆盖前拷入资产目录
+        for key, frame in list(self.data["base_frames"].items()):
+            if os.path.dirname(os.path.abspath(frame)) != os.path.abspath(self.frames_dir):
+                self._store_frame(key, frame)
+
+    def register_characters(self, characters: list):
+        """为尚未登记的角色生成资产 (已登记的保持不变)"""
+        for char in characters:
+            name = char['name']
+            if name in self.data["characters"]:
+                continue
+            appearance = char.get('appearance_fixed', {})
+            fragment = ", ".join(
+                appearance[k] for k in APPEARANCE_FIELDS if appearance.get(k)
+            )
+            refs = char.get('reference_images', [])
+            self.data["characters"][name] = {
+                "char_id": char.get('char_id', name),
+                "seed": stable_seed(char.get('char_id', name)),
+                "prompt_fragment": fragment,
+                "reference_image": refs[0] if refs else ""
+            }
+            self._dirty = True
+
+    def appearance_map(self) -> dict:
+        """角色名 -> 外貌提示词片段 (供build_image_prompt使用)"""
+        return {
+            name: asset["prompt_fragment"]
+            for name, asset in self.data["characters"].items()
+        }
+
+    def shot_request(self, shot: dict) -> dict:
+        """镜头的生成参数: 主角色的种子 + 参考图 (优先 (角色, 场景) 基准帧)"""
+        chars = shot.get('characters', [])
+        asset = self.data["characters"].get(chars[0]) if chars else None
+        if not asset:
+            return {"seed": None, "ref_image": None}
+
+        frame = self.data["base_frames"].get(self._frame_key(chars[0], shot))
+        if frame and not os.path.exists(frame):
+            frame = None
+        return {
+            "seed": asset["seed"],
+            "ref_image": frame or asset["reference_image"] or None
+        }
+
+    def has_base_frame(self, shot: dict) -> bool:
+        chars = shot.get('characters', [])
+        return bool(chars) and self._frame_key(chars[0], shot) in self.data["base_frames"]
+
+    def record_base_frame(self, shot: dict, image_path: str):
+        """记录 (角色, 场景) 的首张成功图片作为基准帧 (拷贝到资产目录)"""
+        chars = shot.get('characters', [])
+        if not chars or chars[0] not in self.data["characters"]:
+            return
+        key = self._frame_key(chars[0], shot)
+        if key not in self.data["base_frames"]:
+            self._store_frame(key, image_path)
+
+    def _store_frame(self, key: str, image_path: str):
+        """拷贝基准帧到资产目录并登记；源文件缺失则移除该记录"""
+        if not os.path.exists(image_path):
+            if self.data["base_frames"].pop(key, None) is not None:
+                self._dirty = True
+            return
+        ext = os.path.splitext(image_path)[1] or ".jpg"
+        name = hashlib.md5(key.encode("utf-8")).hexdigest()[:16] + ext
+        stored = os.path.join(self.frames_dir, name)
+        os.makedirs(self.frames_dir, exist_ok=True)
+        shutil.copyfile(image_path, stored)
+        self.data["base_frames"][key] = stored
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        self._dirty = False
+
+    @staticmethod
+    def _frame_key(name: str, shot: dict) -> str:
+        return f"{name}|{shot.get('scene', '')}"
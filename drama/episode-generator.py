@@ -16,13 +16,20 @@ from datetime import datetime
 # 添加当前目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from aliyun_api import AliyunAPI, get_voice_for_gender
-from prompt_template import build_script_prompt, build_image_prompt, parse_script_response
+from aliyun_api import AliyunAPI, get_voice_for_gender, TTS_VOICES
+from prompt_template import build_script_prompt, build_image_prompt, parse_script_response, get_shot_voice
+from character_assets import CharacterAssets
+from image_dedup import ImageIndex
+from motion import render_motion_clip
 
 # 配置
 UNIVERSE_DIR = '/home/li/.openclaw/workspace/drama/universe'
 OUTPUT_DIR = '/home/li/.openclaw/workspace/drama/output'
 DESKTOP_DIR = '/home/li/Desktop'
+VOICE_MAP_FILE = f'{UNIVERSE_DIR}/voices.json'
+TTS_CACHE_DIR = f'{OUTPUT_DIR}/tts_cache'
+# 近似重复镜头复用阈值 (提示词n-gram Jaccard相似度)
+IMAGE_DEDUP_THRESHOLD = float(os.environ.get('DRAMA_IMAGE_DEDUP_THRESHOLD', '0.85'))
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -45,13 +52,38 @@ def load_universe():
 
 
 def load_char_voice_map(characters):
-    """加载角色音色映射"""
+    """加载角色音色映射
+    
+    音色持久化在 voices.json 中，已分配的角色保持不变，新角色按名字确定性分配，
+    保证跨集同一角色音色一致 (TTS缓存才能命中)。
+    旁白最先分配且计入已占用音色；与旁白撞音色的角色 (旧版映射) 重新分配
+    """
     global CHAR_VOICE_MAP
+    voice_map = {}
+    if os.path.exists(VOICE_MAP_FILE):
+        with open(VOICE_MAP_FILE, encoding='utf-8') as f:
+            voice_map = json.load(f)
+    
+    changed = False
+    if 'narrator' not in voice_map:
+        voice_map['narrator'] = TTS_VOICES['default']
+        changed = True
     for char in characters:
         name = char['name']
-        gender = char.get('gender', '女')
-        CHAR_VOICE_MAP[name] = get_voice_for_gender(gender)
+        if name not in voice_map or voice_map[name] == voice_map['narrator']:
+            gender = char.get('gender', '女')
+            taken = {v for k, v in voice_map.items() if k != name}
+            voice_map[name] = get_voice_for_gender(gender, name, taken)
+            changed = True
+    
+    if changed:
+        with open(VOICE_MAP_FILE, 'w', encoding='utf-8') as f:
+            json.dump(voice_map, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+    
+    CHAR_VOICE_MAP = voice_map
     print(f"  🎤 角色音色映射: {CHAR_VOICE_MAP}")
+    return CHAR_VOICE_MAP
 
 
 def get_prev_summary(progress):
@@ -143,61 +175,124 @@ def create_default_script(episode_info):
     }
 
 
+def download_image(url, img_path):
+    """下载图片到本地"""
+    resp = requests.get(url, timeout=30)
+    os.makedirs(os.path.dirname(img_path), exist_ok=True)
+    with open(img_path, 'wb') as f:
+        f.write(resp.content)
+    return img_path
+
+
 def generate_images(api, script_data, characters):
-    """2. 生成图片 (万相API) - 并行"""
+    """2. 生成图片 (万相API) - 并行
+    
+    近似重复的镜头复用已有图片 (本集或往集)；
+    先生成各 (角色, 场景) 尚无基准帧的首个镜头，再以基准帧为参考图生成其余镜头
+    """
     print("\n🖼️ 步骤2: 生成图片...")
     
     shots = script_data.get('shots', [])
+    ep_num = script_data['episode']
     
-    # 构建角色外貌映射
-    char_appearance = {}
-    for char in characters:
-        char_appearance[char['name']] = char.get('appearance_fixed', {})
+    # 角色资产: 固定外貌片段 + 种子 + 参考图/基准帧
+    assets = CharacterAssets(f'{UNIVERSE_DIR}/assets.json')
+    assets.register_characters(characters)
+    char_appearance = assets.appearance_map()
+    index = ImageIndex(f'{UNIVERSE_DIR}/image_index.json', threshold=IMAGE_DEDUP_THRESHOLD)
     
     # 生成提示词
-    prompts = []
-    for shot in shots:
-        prompt = shot.get('visual_prompt', '')
-        if not prompt:
-            # 使用scene字段作为后备
-            prompt = f"{shot.get('scene', 'scene')}, high quality, realistic, 9:16"
-        prompts.append(prompt)
+    prompts = [build_image_prompt(shot, char_appearance) for shot in shots]
+    
+    # 去重: 命中索引的镜头复用，其余待生成；每个镜头都登记 (复用结果也可被后续镜头匹配)
+    # 本集旧条目先移除: 其图片将被本次结果覆盖
+    index.forget_episode(ep_num)
+    reused = {}   # 镜头序号 -> (来源索引条目, 相似度)
+    entries = {}  # 镜头序号 -> 本镜头的索引条目
+    for i, prompt in enumerate(prompts):
+        entry, score = index.lookup(prompt)
+        if entry:
+            reused[i] = (entry, score)
+        entries[i] = index.add(prompt, episode=ep_num, shot=i + 1)
+    
+    # 划分阶段: 建立基准帧的镜头优先
+    anchors, rest, seen = [], [], set()
+    for i in entries:
+        if i in reused:
+            continue
+        shot = shots[i]
+        chars = shot.get('characters', [])
+        key = (chars[0] if chars else None, shot.get('scene', ''))
+        if chars and key not in seen and not assets.has_base_frame(shot):
+            anchors.append(i)
+        else:
+            rest.append(i)
+        seen.add(key)
     
-    # 并行生成图片
-    print(f"  📸 准备生成 {len(prompts)} 张图片...")
+    print(f"  📸 准备生成 {len(entries) - len(reused)} 张图片 (基准帧 {len(anchors)} 张, 复用 {len(reused)} 张)...")
     
-    try:
-        image_urls = api.generate_images_parallel(prompts, size="720*1280", batch_size=6)
+    image_paths = [None] * len(prompts)
+    
+    def generate(phase):
+        """生成一组镜头并下载"""
+        shot_requests = [assets.shot_request(shots[i]) for i in phase]
+        image_urls = api.generate_images_parallel(
+            [prompts[i] for i in phase], size="720*1280", batch_size=6,
+            seeds=[r['seed'] for r in shot_requests],
+            ref_images=[r['ref_image'] for r in shot_requests]
+        )
         
         # 下载图片
-        image_paths = []
-        ep_num = script_data['episode']
+        for i, url in zip(phase, image_urls):
+            if not url:
+                continue
+            img_path = f"{OUTPUT_DIR}/EP{ep_num:03d}/images/shot_{i+1:02d}.jpg"
+            try:
+                image_paths[i] = download_image(url, img_path)
+                entries[i]['image'] = img_path
+                assets.record_base_frame(shots[i], img_path)
+                print(f"    镜头{i+1}: ✅")
+            except Exception as e:
+                print(f"    镜头{i+1}: ❌ {e}")
+    
+    try:
+        for phase in (anchors, rest):
+            if phase:
+                generate(phase)
         
-        for i, url in enumerate(image_urls):
-            if url:
-                img_path = f"{OUTPUT_DIR}/EP{ep_num:03d}/images/shot_{i+1:02d}.jpg"
-                try:
-                    resp = requests.get(url, timeout=30)
-                    os.makedirs(os.path.dirname(img_path), exist_ok=True)
-                    with open(img_path, 'wb') as f:
-                        f.write(resp.content)
-                    image_paths.append(img_path)
-                    print(f"    镜头{i+1}: ✅")
-                except Exception as e:
-                    print(f"    镜头{i+1}: ❌ {e}")
-                    image_paths.append(None)
-            else:
-                image_paths.append(None)
+        # 复用近似重复镜头 (来源缺失或复用出错则改为生成)
+        fallback = []
+        for i, (entry, score) in reused.items():
+            if not entry.get('image'):
+                print(f"    镜头{i+1}: ⚠️ 复用来源缺失，改为生成")
+                fallback.append(i)
+                continue
+            img_path = f"{OUTPUT_DIR}/EP{ep_num:03d}/images/shot_{i+1:02d}.jpg"
+            try:
+                image_paths[i] = index.reuse(entry, score, img_path, variant=i)
+            except Exception as e:
+                print(f"    镜头{i+1}: ⚠️ 复用失败，改为生成 ({e})")
+                fallback.append(i)
+                continue
+            entries[i]['image'] = img_path
+            print(f"    镜头{i+1}: ♻️ 复用 (相似度 {score:.2f})")
+        if fallback:
+            generate(fallback)
         
         # 统计
         success_count = sum(1 for p in image_paths if p)
         print(f"  ✅ 图片生成完成: {success_count}/{len(prompts)}")
+        print(f"  {index.report()}")
         
         return image_paths
         
     except Exception as e:
         print(f"  ❌ 图片生成失败: {e}")
-        return [None] * len(prompts)
+        return image_paths
+    
+    finally:
+        assets.save()
+        index.save()
 
 
 def generate_voice(api, script_data, characters):
@@ -217,17 +312,13 @@ def generate_voice(api, script_data, characters):
         if not dialogue:
             dialogue = " "
         
-        # 确定音色
-        chars = shot.get('characters', [])
-        if chars and chars[0] in CHAR_VOICE_MAP:
-            voice = CHAR_VOICE_MAP[chars[0]]
-        else:
-            voice = "xiaoyun"  # 默认女声
+        # 确定音色 (与extract_dialogue_for_tts共用同一张表)
+        voice = get_shot_voice(shot, CHAR_VOICE_MAP)
         
         output_path = f"{voice_dir}/shot_{i+1:02d}.mp3"
         
         try:
-            api.generate_tts(dialogue, voice, output_path)
+            api.generate_tts(dialogue, voice, output_path, cache_dir=TTS_CACHE_DIR)
             voice_files.append(output_path)
             print(f"    镜头{i+1} ({voice}): ✅")
         except Exception as e:
@@ -241,8 +332,8 @@ def generate_voice(api, script_data, characters):
     return voice_files
 
 
-def render_video(ep_num, image_paths, voice_files):
-    """4. 渲染合成视频"""
+def render_video(ep_num, image_paths, voice_files, shots=None):
+    """4. 渲染合成视频 (按镜头景别运镜)"""
     print("\n🎬 步骤4: 渲染视频...")
     
     ep_dir = f"{OUTPUT_DIR}/EP{ep_num:03d}"
@@ -250,6 +341,7 @@ def render_video(ep_num, image_paths, voice_files):
     
     output_video = f"{ep_dir}/final.mp4"
     concat_file = f"{ep_dir}/concat.txt"
+    shots = shots or []
     
     # 准备合并列表
     with open(concat_file, 'w') as f:
@@ -264,34 +356,12 @@ def render_video(ep_num, image_paths, voice_files):
             clip_file = f"{ep_dir}/clips/clip_{i+1:02d}.mp4"
             os.makedirs(f"{ep_dir}/clips", exist_ok=True)
             
-            # 使用ffmpeg合成 (图片 + 配音)
+            # 使用ffmpeg合成 (图片运镜 + 配音)
             duration = 10  # 10秒/镜头
+            camera = shots[i].get('camera', '') if i < len(shots) else ''
             
-            if voice and os.path.exists(voice):
-                # 有配音: 图片 + 配音
-                cmd = [
-                    'ffmpeg', '-y',
-                    '-loop', '1', '-i', img,
-                    '-i', voice,
-                    '-c:v', 'libx264', '-t', str(duration),
-                    '-vf', 'scale=720:1280:force_original_aspect_ratio=decrease,pad=720:1280:(ow-iw)/2:(oh-ih)/2',
-                    '-c:a', 'aac', '-shortest',
-                    '-movflags', '+faststart',
-                    clip_file
-                ]
-            else:
-                # 无配音: 只有图片
-                cmd = [
-                    'ffmpeg', '-y',
-                    '-loop', '1', '-i', img,
-                    '-c:v', 'libx264', '-t', str(duration),
-                    '-vf', 'scale=720:1280:force_original_aspect_ratio=decrease,pad=720:1280:(ow-iw)/2:(oh-ih)/2',
-                    '-an',
-                    '-movflags', '+faststart',
-                    clip_file
-                ]
-            
-            subprocess.run(cmd, capture_output=True)
+            render_motion_clip(img, clip_file, camera, duration,
+                               audio_path=voice or None, variant=i)
             
             if os.path.exists(clip_file):
                 f.write(f"file '{clip_file}'\n")
@@ -383,7 +453,7 @@ def main():
     voice_files = generate_voice(api, script_data, characters)
     
     # 8. 渲染视频
-    video_path = render_video(episode_num, image_paths, voice_files)
+    video_path = render_video(episode_num, image_paths, voice_files, script_data.get('shots', []))
     
     # 9. 更新进度
     update_progress(episode_num)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+镜头图片去重
+提示词归一化 + 字符n-gram签名 (Jaccard相似度)，
+跨镜头/跨集检测近似重复的画面，直接复用或用ffmpeg轻微裁切变化后复用，节省生成调用
+"""
+
+import os
+import re
+import json
+import zlib
+import shutil
+import subprocess
+
+INDEX_FILE = '/home/li/.openclaw/workspace/drama/universe/image_index.json'
+
+# 不影响画面内容的质量修饰词
+QUALITY_WORDS = [
+    "9:16 vertical video frame", "high quality", "detailed", "realistic",
+    "9:16", "4k", "8k", "hd", "masterpiece", "cinematic"
+]
+
+# 相似度阈值: >= threshold 复用; >= EXACT_THRESHOLD 直接拷贝，否则轻微裁切变化
+DEFAULT_THRESHOLD = 0.85
+EXACT_THRESHOLD = 0.97
+
+# 轻微变化: (裁切比例, x偏移比例, y偏移比例)，按镜头号轮换
+VARIATIONS = [
+    (0.90, 0.50, 0.50),
+    (0.88, 0.30, 0.40),
+    (0.88, 0.70, 0.40),
+    (0.92, 0.50, 0.20),
+]
+
+_QUALITY = re.compile(
+    r"(?<!\w)(?:" + "|".join(re.escape(w) for w in QUALITY_WORDS) + r")(?!\w)"
+)
+_PUNCT = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """归一化提示词: 小写、去质量词、去标点、合并空白"""
+    text = _QUALITY.sub(" ", prompt.lower())
+    text = _PUNCT.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def signature(text: str, n: int = 3) -> set:
+    """字符n-gram签名 (crc32，跨进程稳定，中英文通用)"""
+    if len(text) < n:
+        return {zlib.crc32(text.encode("utf-8"))} if text else set()
+    return {
+        zlib.crc32(text[i:i + n].encode("utf-8"))
+        for i in range(len(text) - n + 1)
+    }
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ImageIndex:
+    """已生成图片的提示词索引 (跨集持久化)"""
+
+    def __init__(self, path: str = INDEX_FILE, threshold: float = DEFAULT_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.entries = []
+        self.stats = {"lookups": 0, "reused": 0, "calls_saved_total": 0}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.stats["calls_saved_total"] = data.get("calls_saved_total", 0)
+            for entry in data.get("entries", []):
+                if entry.get("image") and os.path.exists(entry["image"]):
+                    entry["sig"] = set(entry["sig"])
+                    self.entries.append(entry)
+
+    def lookup(self, prompt: str):
+        """查找最相似的条目，返回 (entry, score)，低于阈值返回 (None, score)
+
+        达到阈值的条目中优先返回已有图片的；尚未生成 (image为空) 的本集条目仅在没有其他命中时返回
+        """
+        self.stats["lookups"] += 1
+        sig = signature(normalize_prompt(prompt))
+        best, best_score = None, 0.0
+        ready, ready_score = None, 0.0
+        for entry in self.entries:
+            score = jaccard(sig, entry["sig"])
+            if score > best_score:
+                best, best_score = entry, score
+            if entry.get("image") and score > ready_score:
+                ready, ready_score = entry, score
+        if ready_score >= self.threshold:
+            return ready, ready_score
+        if best_score >= self.threshold:
+            return best, best_score
+        return None, best_score
+
+    def forget_episode(self, episode: int):
+        """移除某集的全部条目 (重新生成该集前调用，避免匹配到即将被覆盖的旧图)"""
+        self.entries = [e for e in self.entries if e.get("episode") != episode]
+
+    def add(self, prompt: str, image: str = None, episode: int = None, shot: int = None) -> dict:
+        """登记提示词 (image可稍后生成成功后再填)；同一集同一镜头的旧条目被替换"""
+        if episode is not None and shot is not None:
+            self.entries = [
+                e for e in self.entries
+                if (e.get("episode"), e.get("shot")) != (episode, shot)
+            ]
+        normalized = normalize_prompt(prompt)
+        entry = {
+            "prompt": normalized,
+            "sig": signature(normalized),
+            "image": image,
+            "episode": episode,
+            "shot": shot
+        }
+        self.entries.append(entry)
+        return entry
+
+    def reuse(self, entry: dict, score: float, output_path: str, variant: int = 0) -> str:
+        """复用已有图片: 高度相似直接拷贝，否则裁切变化 (ffmpeg失败时退化为拷贝)
+
+        来源与目标是同一文件时抛出ValueError (无法原地拷贝/裁切)
+        """
+        src = entry["image"]
+        if os.path.abspath(src) == os.path.abspath(output_path) or (
+                os.path.exists(output_path) and os.path.samefile(src, output_path)):
+            raise ValueError(f"复用来源与目标是同一文件: {output_path}")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if score >= EXACT_THRESHOLD or not vary_image(src, output_path, variant):
+            shutil.copyfile(src, output_path)
+        self.stats["reused"] += 1
+        self.stats["calls_saved_total"] += 1
+        return output_path
+
+    def save(self):
+        entries = [
+            dict(e, sig=sorted(e["sig"])) for e in self.entries
+            if e.get("image") and os.path.exists(e["image"])
+        ]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "calls_saved_total": self.stats["calls_saved_total"],
+                "entries": entries
+            }, f, ensure_ascii=False)
+
+    def report(self) -> str:
+        return (f"♻️ 图片复用 {self.stats['reused']}/{self.stats['lookups']} 张，"
+                f"本次节省 {self.stats['reused']} 次调用 "
+                f"(累计 {self.stats['calls_saved_total']})")
+
+
+def vary_image(src: str, dst: str, variant: int = 0) -> bool:
+    """用ffmpeg做轻微裁切+缩放回原尺寸，生成与原图略有差异的画面"""
+    ratio, fx, fy = VARIATIONS[variant % len(VARIATIONS)]
+    vf = (
+        f"crop=iw*{ratio}:ih*{ratio}:(iw-iw*{ratio})*{fx}:(ih-ih*{ratio})*{fy},"
+        f"scale=iw/{ratio}:ih/{ratio}"
+    )
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-y', '-i', src, '-vf', vf, '-q:v', '2', dst],
+            capture_output=True, timeout=60
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0 and os.path.exists(dst)
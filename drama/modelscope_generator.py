@@ -12,76 +12,47 @@ MODELSCOPE_TOKEN = "ms-ecf935d5-75fe-4486-a2d2-876a39d5f3a1"
 
 os.environ['MODELSCOPE_TOKEN'] = MODELSCOPE_TOKEN
 
-from modelscope.hub.api import HubApi
-from modelscope.pipelines import pipeline
-from modelscope.outputs import OutputKeys
+from modelscope_worker import infer, infer_many, local_registry
 
 # 输出目录
 OUTPUT_DIR = '/home/li/.openclaw/workspace/drama/video_gen/modelscope'
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# 全局pipeline (避免重复加载)
-_video_pipeline = None
 
 def get_video_pipeline():
-    """获取视频生成pipeline"""
-    global _video_pipeline
-    
-    if _video_pipeline is None:
-        print("🔄 加载I2VGen-XL模型...")
-        try:
-            # I2VGen-XL: 图生视频
-            _video_pipeline = pipeline(
-                'image-to-video', 
-                model='i2vgen-xl',
-                model_revision='v1.0'
-            )
-            print("✅ 模型加载成功!")
-        except Exception as e:
-            print(f"❌ 模型加载失败: {e}")
-            # 使用备选
-            _video_pipeline = None
-    
-    return _video_pipeline
+    """获取视频生成pipeline (进程内只加载一次，见 modelscope_worker.ModelRegistry)"""
+    try:
+        return local_registry().get('image-to-video')
+    except Exception as e:
+        print(f"❌ 模型加载失败: {e}")
+        return None
 
 def generate_image_to_video(image_path, prompt="", output_name="output"):
     """
     图生视频 (I2VGen-XL)
     
+    优先交给常驻worker (模型已加载)，否则在本进程懒加载一次
+    
     Args:
         image_path: 输入图片路径
         prompt: 提示词
         output_name: 输出文件名
     """
     
-    pipeline = get_video_pipeline()
-    
-    if pipeline is None:
-        return generate_fallback_video(image_path, prompt, output_name)
-    
     print(f"🎬 正在生成视频...")
     print(f"   图片: {image_path}")
     print(f"   提示词: {prompt}")
     
     try:
-        # 调用ModelScope API
-        output = pipeline({
-            'image': image_path,
-            'prompt': prompt
-        })
-        
-        # 保存视频
         output_path = f"{OUTPUT_DIR}/{output_name}_{int(time.time())}.mp4"
+        result = infer('image_to_video', image_path=image_path, prompt=prompt,
+                       output_path=output_path)
         
-        # 检查输出
-        if OutputKeys.OUTPUT_VIDEO in output:
-            with open(output_path, 'wb') as f:
-                f.write(output[OutputKeys.OUTPUT_VIDEO])
-            print(f"✅ 视频生成成功: {output_path}")
-        else:
+        if not result:
             print(f"⚠️ 未生成视频，使用备选方案")
             return generate_fallback_video(image_path, prompt, output_name)
         
+        print(f"✅ 视频生成成功: {output_path}")
         return output_path
         
     except Exception as e:
@@ -91,85 +62,130 @@ def generate_image_to_video(image_path, prompt="", output_name="output"):
 def generate_text_to_image(prompt, output_name="image"):
     """
     文生图 (Stable Diffusion)
+    
+    模型在进程内/常驻worker中只加载一次
     """
     
     print(f"🖼️ 正在生成图片: {prompt}")
     
     try:
-        # 使用SD模型
-        sd_pipeline = pipeline(
-            'text-to-image', 
-            model='stable-diffusion-v1.5',
-            model_revision='v1.0'
-        )
-        
-        output = sd_pipeline({
-            'text': prompt,
-            'num_inference_steps': 20
-        })
-        
-        # 保存图片
         output_path = f"{OUTPUT_DIR}/{output_name}_{int(time.time())}.jpg"
-        output[OutputKeys.OUTPUT_IMAGE].save(output_path)
+        infer('text_to_image', prompt=prompt, output_path=output_path,
+              num_inference_steps=20)
         
         print(f"✅ 图片生成成功: {output_path}")
         return output_path
         
     except Exception as e:
         print(f"❌ 图片生成失败: {e}")
-        # 创建占位图
-        from PIL import Image, ImageDraw, ImageFont
-        
-        img = Image.new('RGB', (720, 1280), color=(30, 30, 60))
-        draw = ImageDraw.Draw(img)
-        
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
-        except:
-            font = ImageFont.load_default()
-        
-        draw.text((360, 640), prompt[:20], fill=(255, 255, 255), font=font, anchor="mm")
-        
-        output_path = f"{OUTPUT_DIR}/{output_name}_{int(time.time())}.jpg"
-        img.save(output_path)
-        
-        return output_path
+        return generate_placeholder_image(prompt, output_name)
 
-def generate_fallback_video(image_path, prompt, output_name):
-    """使用ffmpeg生成备选视频"""
+def generate_text_to_images(prompts, output_name="shot"):
+    """
+    批量文生图: 全部镜头同时提交，由批处理队列聚合推理
+    
+    Returns:
+        与prompts一一对应的图片路径 (失败项为占位图)
+    """
+    
+    print(f"🖼️ 批量生成图片: {len(prompts)}张")
+    stamp = int(time.time())
+    requests = [
+        {"prompt": prompt, "output_path": f"{OUTPUT_DIR}/{output_name}_{i+1:02d}_{stamp}.jpg",
+         "num_inference_steps": 20}
+        for i, prompt in enumerate(prompts)
+    ]
+    
+    results = infer_many('text_to_image', requests)
+    
+    paths = []
+    for i, (prompt, result) in enumerate(zip(prompts, results)):
+        if isinstance(result, Exception):
+            print(f"❌ 镜头{i+1}图片生成失败: {result}")
+            paths.append(generate_placeholder_image(prompt, f"{output_name}_{i+1:02d}"))
+        else:
+            paths.append(result)
+    return paths
+
+def generate_images_to_videos(image_paths, prompts, output_name="shot"):
+    """
+    批量图生视频: 全部镜头同时提交，失败项使用运镜备选视频
+    """
+    
+    print(f"🎬 批量生成视频: {len(image_paths)}段")
+    stamp = int(time.time())
+    requests = [
+        {"image_path": image_path, "prompt": prompt,
+         "output_path": f"{OUTPUT_DIR}/{output_name}_{i+1:02d}_{stamp}.mp4"}
+        for i, (image_path, prompt) in enumerate(zip(image_paths, prompts))
+    ]
+    
+    results = infer_many('image_to_video', requests)
+    
+    paths = []
+    for i, result in enumerate(results):
+        if isinstance(result, Exception) or not result:
+            paths.append(generate_fallback_video(image_paths[i], prompts[i], f"{output_name}_{i+1:02d}"))
+        else:
+            paths.append(result)
+    return paths
+
+def generate_placeholder_image(prompt, output_name):
+    """创建占位图"""
+    from PIL import Image, ImageDraw, ImageFont
+    
+    img = Image.new('RGB', (720, 1280), color=(30, 30, 60))
+    draw = ImageDraw.Draw(img)
+    
+    try:
+        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
+    except:
+        font = ImageFont.load_default()
+    
+    draw.text((360, 640), prompt[:20], fill=(255, 255, 255), font=font, anchor="mm")
+    
+    output_path = f"{OUTPUT_DIR}/{output_name}_{int(time.time())}.jpg"
+    img.save(output_path)
+    
+    return output_path
+
+def generate_fallback_video(image_path, prompt, output_name, camera="近景"):
+    """使用ffmpeg生成备选视频 (按景别运镜)"""
+    from motion import render_motion_clip
     
     video_path = f"{OUTPUT_DIR}/{output_name}_{int(time.time())}.mp4"
     
-    import subprocess
-    subprocess.run([
-        'ffmpeg', '-y',
-        '-loop', '1', '-i', image_path,
-        '-c:v', 'libx264', '-t', '4',
-        '-vf', 'zoompan=z=1.05:d=4:s=720x1280',
-        '-shortest', video_path
-    ], capture_output=True)
+    render_motion_clip(image_path, video_path, camera, duration=4)
     
     print(f"✅ 备选视频生成: {video_path}")
     return video_path
 
-def full_workflow(prompt, output_name="drama"):
+def full_workflow(prompts, output_name="drama"):
     """
     完整工作流: 文生图 → 图生视频
+    
+    prompts 可为单个提示词或多个镜头的提示词列表；各镜头同时提交，由批处理队列聚合推理
+    
+    Returns:
+        单个提示词返回视频路径，列表返回与之一一对应的视频路径
     """
+    single = isinstance(prompts, str)
+    if single:
+        prompts = [prompts]
     
     print(f"\n=== 完整生成工作流 ===")
-    print(f"主题: {prompt}\n")
+    print(f"镜头: {len(prompts)} 个\n")
     
     # 1. 文生图
     print("1️⃣ 步骤1: 生成图片...")
-    image_path = generate_text_to_image(prompt, output_name)
+    image_paths = generate_text_to_images(prompts, output_name)
     
     # 2. 图生视频
     print("\n2️⃣ 步骤2: 生成视频...")
-    video_path = generate_image_to_video(image_path, prompt, output_name)
+    video_paths = generate_images_to_videos(image_paths, prompts, output_name)
     
-    print(f"\n✅ 完成! 视频: {video_path}")
-    return video_path
+    print(f"\n✅ 完成! 视频: {video_paths}")
+    return video_paths[0] if single else video_paths
 
 if __name__ == '__main__':
     print("=== ModelScope AI视频生成器 ===\n")
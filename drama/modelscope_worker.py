@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+ModelScope 模型常驻进程
+- ModelRegistry: 每个pipeline在进程内按需加载一次，超出内存上限时按LRU卸载，记录加载/推理耗时
+- 常驻worker: 通过Unix socket (JSON行协议) 对外提供推理，脚本之间共享已加载的模型
+- InferenceBatcher: 短时间窗口内聚合同一模型的请求，批量在CPU上推理，结果经Future返回
+- 客户端在worker不可用时退回进程内registry
+
+用法:
+  python3 modelscope_worker.py serve [--socket PATH] [--memory-cap-mb N]
+  python3 modelscope_worker.py stats
+"""
+
+import os
+import gc
+import json
+import time
+import socket
+import threading
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+SOCKET_PATH = os.environ.get('MODELSCOPE_WORKER_SOCKET', '/tmp/modelscope-worker.sock')
+MEMORY_CAP_MB = int(os.environ.get('MODELSCOPE_MEMORY_CAP_MB', '12000'))
+# 批处理: 聚合窗口、单批上限、CPU算子内线程数 (0 = 框架默认)
+BATCH_WINDOW_MS = int(os.environ.get('MODELSCOPE_BATCH_WINDOW_MS', '50'))
+MAX_BATCH_SIZE = int(os.environ.get('MODELSCOPE_MAX_BATCH_SIZE', '8'))
+INTRA_OP_THREADS = int(os.environ.get('MODELSCOPE_INTRA_OP_THREADS', '0'))
+
+# 模型规格: 名称 -> pipeline参数
+MODEL_SPECS = {
+    'image-to-video': {'task': 'image-to-video', 'model': 'i2vgen-xl', 'model_revision': 'v1.0'},
+    'text-to-image': {'task': 'text-to-image', 'model': 'stable-diffusion-v1.5', 'model_revision': 'v1.0'},
+}
+
+
+def rss_mb() -> float:
+    """当前进程常驻内存 (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class ModelRegistry:
+    """进程内模型表: 懒加载 + LRU内存上限 + 耗时统计"""
+
+    def __init__(self, memory_cap_mb: int = MEMORY_CAP_MB):
+        self.memory_cap_mb = memory_cap_mb
+        self._models = OrderedDict()  # 名称 -> {"pipeline", "mem_mb"}
+        self._lock = threading.RLock()
+        self.stats = {}
+
+    def get(self, name: str):
+        """获取pipeline (首次调用时加载)"""
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]["pipeline"]
+
+            spec = MODEL_SPECS[name]
+            from modelscope.pipelines import pipeline
+
+            print(f"🔄 加载模型 {name} ({spec['model']})...")
+            before = rss_mb()
+            start = time.perf_counter()
+            loaded = pipeline(spec['task'], model=spec['model'],
+                              model_revision=spec['model_revision'])
+            load_s = time.perf_counter() - start
+            mem_mb = max(rss_mb() - before, 0.0)
+
+            self._models[name] = {"pipeline": loaded, "mem_mb": mem_mb}
+            stat = self._stat(name)
+            stat["loads"] += 1
+            stat["load_s"] += load_s
+            stat["mem_mb"] = mem_mb
+            print(f"✅ 模型加载成功: {name} ({load_s:.1f}s, ~{mem_mb:.0f}MB)")
+
+            self._evict(keep=name)
+            return loaded
+
+    def run(self, name: str, inputs, **kwargs):
+        """执行推理并记录耗时"""
+        model = self.get(name)
+        start = time.perf_counter()
+        output = model(inputs, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stat = self._stat(name)
+            stat["calls"] += 1
+            stat["infer_s"] += elapsed
+        return output
+
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            entry = self._models.pop(name, None)
+        if entry is None:
+            return False
+        del entry
+        gc.collect()
+        print(f"♻️ 已卸载模型: {name}")
+        return True
+
+    def loaded(self) -> list:
+        with self._lock:
+            return list(self._models)
+
+    def timings(self) -> dict:
+        with self._lock:
+            return {
+                "rss_mb": round(rss_mb(), 1),
+                "memory_cap_mb": self.memory_cap_mb,
+                "loaded": list(self._models),
+                "models": {k: dict(v) for k, v in self.stats.items()},
+            }
+
+    def _evict(self, keep: str):
+        """总占用超过上限时，按最久未使用顺序卸载 (保留刚加载的模型)"""
+        while True:
+            with self._lock:
+                total = sum(m["mem_mb"] for m in self._models.values())
+                if total <= self.memory_cap_mb or len(self._models) <= 1:
+                    return
+                victim = next(n for n in self._models if n != keep)
+            self.unload(victim)
+
+    def _stat(self, name: str) -> dict:
+        return self.stats.setdefault(name, {
+            "loads": 0, "load_s": 0.0, "calls": 0, "infer_s": 0.0, "mem_mb": 0.0
+        })
+
+
+class InferenceBatcher:
+    """按模型聚合请求的批处理队列
+
+    submit() 立即返回Future；每个模型一个后台线程，收到首个请求后再等待window_ms
+    收集更多请求 (最多max_batch个)，以列表输入一次调用pipeline；
+    pipeline不支持批量输入时逐条执行
+    """
+
+    def __init__(self, registry: ModelRegistry, window_ms: int = BATCH_WINDOW_MS,
+                 max_batch: int = MAX_BATCH_SIZE, intra_op_threads: int = INTRA_OP_THREADS):
+        self.registry = registry
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queues = {}  # 模型名 -> [(inputs, future)]
+        self._cond = threading.Condition()
+        self._threads = {}
+        self.stats = {}
+        if intra_op_threads > 0:
+            set_intra_op_threads(intra_op_threads)
+
+    def submit(self, name: str, inputs) -> Future:
+        future = Future()
+        with self._cond:
+            self._queues.setdefault(name, []).append((inputs, future))
+            if name not in self._threads:
+                thread = threading.Thread(target=self._loop, args=(name,), daemon=True)
+                self._threads[name] = thread
+                thread.start()
+            self._cond.notify_all()
+        return future
+
+    def run(self, name: str, inputs):
+        """同步接口 (与ModelRegistry.run一致)，供推理操作复用"""
+        return self.submit(name, inputs).result()
+
+    def timings(self) -> dict:
+        data = self.registry.timings()
+        with self._cond:
+            data["batches"] = {k: dict(v) for k, v in self.stats.items()}
+        return data
+
+    def _loop(self, name: str):
+        while True:
+            with self._cond:
+                while not self._queues.get(name):
+                    self._cond.wait()
+                # 首个请求到达后等待窗口期，聚合后续请求
+                deadline = time.monotonic() + self.window
+                while len(self._queues[name]) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queues[name][:self.max_batch]
+                del self._queues[name][:self.max_batch]
+            self._run_batch(name, batch)
+
+    def _run_batch(self, name: str, batch: list):
+        inputs = [item for item, _ in batch]
+        start = time.perf_counter()
+        try:
+            outputs = None
+            if len(inputs) > 1:
+                try:
+                    outputs = self.registry.run(name, inputs, batch_size=len(inputs))
+                except TypeError:
+                    outputs = None
+                if not isinstance(outputs, list) or len(outputs) != len(inputs):
+                    outputs = None
+            if outputs is None:
+                outputs = [self.registry.run(name, item) for item in inputs]
+        except Exception:
+            # 整批失败时逐条重试，只让真正失败的请求报错
+            outputs = []
+            for item in inputs:
+                try:
+                    outputs.append(self.registry.run(name, item))
+                except Exception as item_error:
+                    outputs.append(item_error)
+        elapsed = time.perf_counter() - start
+
+        with self._cond:
+            stat = self.stats.setdefault(name, {"batches": 0, "items": 0, "batch_s": 0.0})
+            stat["batches"] += 1
+            stat["items"] += len(inputs)
+            stat["batch_s"] += elapsed
+
+        for (_, future), output in zip(batch, outputs):
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+
+def set_intra_op_threads(threads: int):
+    """设置CPU推理的算子内线程数 (torch可用时)"""
+    os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+# ============ 推理操作 (进程内与worker共用) ============
+
+def text_to_image(engine, prompt: str, output_path: str,
+                  num_inference_steps: int = 20) -> str:
+    """文生图，保存到output_path (engine为ModelRegistry或InferenceBatcher)"""
+    from modelscope.outputs import OutputKeys
+    output = engine.run('text-to-image', {
+        'text': prompt,
+        'num_inference_steps': num_inference_steps
+    })
+    output[OutputKeys.OUTPUT_IMAGE].save(output_path)
+    return output_path
+
+
+def image_to_video(engine, image_path: str, prompt: str, output_path: str) -> str:
+    """图生视频，保存到output_path；模型未产出视频时返回None"""
+    from modelscope.outputs import OutputKeys
+    output = engine.run('image-to-video', {'image': image_path, 'prompt': prompt})
+    if OutputKeys.OUTPUT_VIDEO not in output:
+        return None
+    with open(output_path, 'wb') as f:
+        f.write(output[OutputKeys.OUTPUT_VIDEO])
+    return output_path
+
+
+OPERATIONS = {
+    'text_to_image': text_to_image,
+    'image_to_video': image_to_video,
+}
+
+
+# ============ 常驻worker ============
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        engine = self.server.engine
+        registry = engine.registry
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.pop('op')
+                if op == 'ping':
+                    result = 'pong'
+                elif op == 'stats':
+                    result = engine.timings()
+                elif op == 'unload':
+                    result = registry.unload(request['model'])
+                else:
+                    result = OPERATIONS[op](engine, **request)
+                reply = {"ok": True, "result": result}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = SOCKET_PATH, engine: InferenceBatcher = None):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.engine = engine or InferenceBatcher(ModelRegistry())
+        super().__init__(socket_path, _Handler)
+
+
+class WorkerClient:
+    """worker客户端 (长连接，单连接串行请求)"""
+
+    def __init__(self, socket_path: str = SOCKET_PATH, timeout: float = 1800):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            return self.call('ping') == 'pong'
+        except (OSError, RuntimeError):
+            return False
+
+    def call(self, op: str, **kwargs):
+        with self._lock:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.settimeout(self.timeout)
+                self._sock.connect(self.socket_path)
+                self._file = self._sock.makefile('rwb')
+            try:
+                payload = json.dumps(dict(kwargs, op=op), ensure_ascii=False) + "\n"
+                self._file.write(payload.encode("utf-8"))
+                self._file.flush()
+                line = self._file.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise OSError("worker连接已关闭")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._file = None
+
+
+_local_engine = None
+_worker_up = None
+_clients = threading.local()
+
+
+def local_registry() -> ModelRegistry:
+    """进程内共享的registry"""
+    return local_engine().registry
+
+
+def local_engine() -> InferenceBatcher:
+    """进程内共享的批处理队列"""
+    global _local_engine
+    if _local_engine is None:
+        _local_engine = InferenceBatcher(ModelRegistry())
+    return _local_engine
+
+
+def infer(op: str, **kwargs):
+    """执行推理: 优先常驻worker (模型已在内存)，不可用时在本进程加载
+
+    每个线程使用独立连接，多线程并发调用时由worker端聚合成批
+    """
+    global _worker_up
+    if _worker_up is None:
+        _worker_up = WorkerClient().available()
+    if _worker_up:
+        client = getattr(_clients, 'client', None)
+        if client is None:
+            client = _clients.client = WorkerClient()
+        try:
+            return client.call(op, **kwargs)
+        except OSError:
+            client.close()
+            _worker_up = None  # worker已退出，下次重新探测
+    return OPERATIONS[op](local_engine(), **kwargs)
+
+
+def infer_many(op: str, requests: list, max_workers: int = MAX_BATCH_SIZE) -> list:
+    """并发提交一组推理请求 (每项为kwargs)，按原顺序返回结果，失败项为异常对象"""
+    def _one(kwargs):
+        try:
+            return infer(op, **kwargs)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(executor.map(_one, requests))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="ModelScope 模型常驻worker")
+    parser.add_argument("command", choices=["serve", "stats"])
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--memory-cap-mb", type=int, default=MEMORY_CAP_MB)
+    parser.add_argument("--batch-window-ms", type=int, default=BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=INTRA_OP_THREADS,
+                        help="CPU算子内线程数 (0 = 框架默认)")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(WorkerClient(args.socket).call('stats'), indent=2, ensure_ascii=False))
+        return
+
+    engine = InferenceBatcher(ModelRegistry(args.memory_cap_mb), args.batch_window_ms,
+                              args.max_batch, args.threads)
+    server = WorkerServer(args.socket, engine)
+    print(f"🚀 ModelScope worker 已启动: {args.socket} "
+          f"(内存上限 {args.memory_cap_mb}MB, 批窗口 {args.batch_window_ms}ms, 单批 {args.max_batch})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+静态镜头运镜 (Ken Burns)
+按镜头景别生成平滑的推拉/平移轨迹，图片只预缩放一次到所需的放大尺寸 (固定尺寸)
+并只解码、转换为yuv420p一次；推拉镜头每帧从中裁切随时间变化的窗口再缩放到固定720x1280，
+平移镜头只做固定尺寸的逐帧裁切。耗时大头在libx264编码，bench同时给出仅滤镜的耗时
+
+用法:
+  python3 motion.py bench <图片> [时长秒]
+"""
+
+import os
+import sys
+import math
+import time
+import shutil
+import tempfile
+import subprocess
+
+WIDTH = 720
+HEIGHT = 1280
+FPS = 25
+
+# 景别 -> 轨迹: zoom (起, 止), pan (起点x, 起点y, 终点x, 终点y) 取值0~1为裁切窗口在可移动范围内的位置
+CAMERA_MOTIONS = {
+    "远景": {"zoom": (1.00, 1.08), "pan": (0.5, 0.6, 0.5, 0.4)},   # 缓慢推进 + 轻微上摇
+    "中景": {"zoom": (1.10, 1.10), "pan": (0.2, 0.5, 0.8, 0.5)},   # 横向平移
+    "近景": {"zoom": (1.00, 1.15), "pan": (0.5, 0.5, 0.5, 0.35)},  # 推近
+    "特写": {"zoom": (1.12, 1.25), "pan": (0.5, 0.4, 0.5, 0.4)},   # 缓慢压迫式推进
+}
+DEFAULT_CAMERA = "中景"
+
+
+def plan_motion(camera: str, duration: float, variant: int = 0) -> dict:
+    """根据景别生成运镜轨迹，variant为奇数时平移方向反转 (相邻镜头不重复同一方向)"""
+    motion = CAMERA_MOTIONS.get((camera or "").strip(), CAMERA_MOTIONS[DEFAULT_CAMERA])
+    x0, y0, x1, y1 = motion["pan"]
+    if variant % 2:
+        x0, x1 = x1, x0
+    z0, z1 = motion["zoom"]
+    return {
+        "duration": max(duration, 0.1),
+        "zoom": (z0, z1),
+        "pan": (x0, y0, x1, y1),
+        "max_zoom": max(z0, z1),
+    }
+
+
+def oversize(plan: dict, width: int = WIDTH, height: int = HEIGHT):
+    """预缩放尺寸: 输出尺寸 × 最大缩放 (取偶数)"""
+    z = plan["max_zoom"]
+    return int(width * z) // 2 * 2, int(height * z) // 2 * 2
+
+
+def motion_filter(plan: dict, width: int = WIDTH, height: int = HEIGHT, fps: int = FPS) -> str:
+    """生成运镜filter (输入须已预缩放到oversize，尺寸固定)
+
+    缓动 p(t) = (1-cos(πt/D))/2，缩放 z(t) 线性插值于 p。
+    预缩放图 (宽 = width×zmax) 中可见窗口为 原尺寸/z(t)：
+    推拉时用zoompan (d=1) 逐帧裁切该窗口并缩放到固定输出尺寸: crop的宽高只在配置时求值，
+    用sendcmd逐帧改宽高在ffmpeg 7下会中断滤镜图，zoompan即逐帧窗口裁切+固定缩放；
+    缩放不变时窗口尺寸固定，只做逐帧位置的crop。
+    时间按输出帧号计算 (配置阶段不依赖t)；输入须已是yuv420p
+    """
+    d = plan["duration"]
+    z0, z1 = plan["zoom"]
+    x0, y0, x1, y1 = plan["pan"]
+
+    if z0 == z1:
+        ease = f"(1-cos(PI*min(n/{fps},{d})/{d}))/2"
+        ow, oh = oversize(plan, width, height)
+        # 最大缩放即当前缩放，窗口与输出1:1；exact=1 按1像素移动 (不对齐色度取偶数)
+        return (
+            f"crop={width}:{height}"
+            f":x='({ow}-{width})*({x0}+({x1}-{x0})*{ease})'"
+            f":y='({oh}-{height})*({y0}+({y1}-{y0})*{ease})'"
+            ":exact=1"
+        )
+
+    ease = f"(1-cos(PI*min(on/{fps},{d})/{d}))/2"
+    return (
+        f"zoompan=z='{z0}+({z1}-{z0})*{ease}':d=1:fps={fps}:s={width}x{height}"
+        f":x='(iw-iw/zoom)*({x0}+({x1}-{x0})*{ease})'"
+        f":y='(ih-ih/zoom)*({y0}+({y1}-{y0})*{ease})'"
+    )
+
+
+def prescale_image(image_path: str, output_path: str, plan: dict,
+                   width: int = WIDTH, height: int = HEIGHT) -> bool:
+    """一次性把图片缩放并居中裁切到oversize (铺满，不留黑边)"""
+    ow, oh = oversize(plan, width, height)
+    result = subprocess.run([
+        'ffmpeg', '-y', '-i', image_path,
+        '-vf', f'scale={ow}:{oh}:force_original_aspect_ratio=increase,crop={ow}:{oh}',
+        '-frames:v', '1', output_path
+    ], capture_output=True)
+    return result.returncode == 0 and os.path.exists(output_path)
+
+
+def media_duration(path: str) -> float:
+    """读取音视频时长 (秒)，失败返回0"""
+    try:
+        result = subprocess.run([
+            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1', path
+        ], capture_output=True, text=True, timeout=30)
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return 0.0
+
+
+def render_motion_clip(image_path: str, output_path: str, camera: str = DEFAULT_CAMERA,
+                       duration: float = 4.0, audio_path: str = None, variant: int = 0,
+                       width: int = WIDTH, height: int = HEIGHT, fps: int = FPS) -> bool:
+    """渲染单个运镜片段 (可选配音，片段时长取配音与duration中较短者)"""
+    if audio_path and os.path.exists(audio_path):
+        audio_len = media_duration(audio_path)
+        if audio_len > 0:
+            duration = min(duration, audio_len)
+    else:
+        audio_path = None
+
+    plan = plan_motion(camera, duration, variant)
+    tmp_dir = tempfile.mkdtemp(prefix='motion_')
+    try:
+        source = os.path.join(tmp_dir, 'source.png')
+        if not prescale_image(image_path, source, plan, width, height):
+            return False
+
+        # 只解码并转换为yuv420p一次，由loop滤镜重复该帧
+        # (-loop 1 会逐帧重新解码PNG，RGB->YUV转换也会逐帧重复，二者占滤镜耗时的大半)
+        frames = math.ceil(plan["duration"] * fps) + 1
+        repeat = f"format=yuv420p,loop=loop={frames - 1}:size=1:start=0,setpts=N/{fps}/TB"
+        cmd = ['ffmpeg', '-y', '-i', source]
+        if audio_path:
+            cmd += ['-i', audio_path]
+        cmd += [
+            '-vf', f"{repeat},{motion_filter(plan, width, height, fps)}", '-r', str(fps),
+            '-c:v', 'libx264', '-preset', 'veryfast', '-t', f'{plan["duration"]:.3f}',
+        ]
+        cmd += ['-c:a', 'aac', '-shortest'] if audio_path else ['-an']
+        cmd += ['-movflags', '+faststart', output_path]
+
+        result = subprocess.run(cmd, capture_output=True)
+        return result.returncode == 0 and os.path.exists(output_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def benchmark(image_path: str, duration: float = 4.0, width: int = WIDTH, height: int = HEIGHT) -> dict:
+    """对比旧zoompan与本模块的耗时: 完整渲染 (编码为libx264) 与只跑滤镜 (不编码)，临时文件用后删除"""
+    tmp_dir = tempfile.mkdtemp(prefix='motion_bench_')
+
+    def timed(cmd):
+        start = time.perf_counter()
+        subprocess.run(cmd, capture_output=True)
+        return time.perf_counter() - start
+
+    try:
+        # 旧方案: 与 generate_video_placeholder 相同的参数
+        old = ['ffmpeg', '-y', '-loop', '1', '-i', image_path, '-t', str(duration),
+               '-vf', f'zoompan=z=1.2:d=4:s={width}x{height}']
+        results = {"zoompan": (
+            timed(old + ['-c:v', 'libx264', '-shortest', os.path.join(tmp_dir, 'zoompan.mp4')]),
+            timed(old + ['-f', 'null', '-'])
+        )}
+        frames = math.ceil(duration * FPS) + 1
+        for camera in CAMERA_MOTIONS:
+            render = timed_call(render_motion_clip, image_path, os.path.join(tmp_dir, f'{camera}.mp4'),
+                                camera, duration, width=width, height=height)
+            plan = plan_motion(camera, duration)
+            source = os.path.join(tmp_dir, f'{camera}.png')
+            prescale_image(image_path, source, plan, width, height)
+            filter_only = timed([
+                'ffmpeg', '-y', '-i', source, '-vf',
+                f"format=yuv420p,loop=loop={frames - 1}:size=1:start=0,setpts=N/{FPS}/TB,"
+                f"{motion_filter(plan, width, height)}",
+                '-r', str(FPS), '-t', str(duration), '-f', 'null', '-'
+            ])
+            results[camera] = (render, filter_only)
+        return results
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def timed_call(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'bench':
+        print(__doc__)
+        sys.exit(1)
+
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 4.0
+    timings = benchmark(sys.argv[2], seconds)
+    render_base, filter_base = timings["zoompan"]
+    print(f"=== 运镜渲染基准 {WIDTH}x{HEIGHT}, {seconds}秒 (完整渲染 / 仅滤镜) ===")
+    for name, (render, filter_only) in timings.items():
+        print(f"  {name:8s} {render:6.2f}s ({render_base / render:.1f}x)"
+              f"  {filter_only:6.2f}s ({filter_base / filter_only:.1f}x)")
@@ -100,18 +100,19 @@ def build_image_prompt(shot: dict, character_appearance: dict) -> str:
     
     Args:
         shot: 镜头信息
-        character_appearance: 角色外貌描述
+        character_appearance: 角色名 -> 固定外貌提示词片段
     
     Returns:
         英文提示词
     """
     
-    # 提取角色外观
-    chars = shot.get("characters", [])
-    char_str = ", ".join(chars) if chars else ""
+    # 以剧本给出的visual_prompt为主体，缺失时使用scene
+    prompt = shot.get("visual_prompt") or shot.get("scene", "")
     
-    # 构建提示词
-    prompt = f"{shot.get('scene', '')}, {char_str}"
+    # 注入角色固定外貌，保持跨镜头一致
+    for name in shot.get("characters", []):
+        fragment = character_appearance.get(name)
+        prompt += f", {name}: {fragment}" if fragment else f", {name}"
     
     if shot.get("emotion"):
         prompt += f", {shot['emotion']} expression"
@@ -147,12 +148,24 @@ def parse_script_response(response: str) -> list:
         return []
 
 
-def extract_dialogue_for_tts(shots: list) -> list:
+def get_shot_voice(shot: dict, voice_map: dict, default: str = "xiaoyun") -> str:
+    """按镜头首个角色查表确定音色，无角色时使用旁白音色"""
+    chars = shot.get("characters", [])
+    character = chars[0] if chars else "narrator"
+    return voice_map.get(character) or voice_map.get("narrator") or default
+
+
+def extract_dialogue_for_tts(shots: list, voice_map: dict = None) -> list:
     """从剧本中提取需要配音的文字
     
+    Args:
+        shots: 镜头列表
+        voice_map: 角色名 -> 音色 (与generate_voice共用同一张表)
+    
     Returns:
         [{"text": str, "voice": str, "character": str}]
     """
+    voice_map = voice_map or {}
     results = []
     
     for shot in shots:
@@ -164,9 +177,9 @@ def extract_dialogue_for_tts(shots: list) -> list:
         chars = shot.get("characters", [])
         character = chars[0] if chars else "narrator"
         
-        # TODO: 根据character查表确定voice
         results.append({
             "text": dialogue,
+            "voice": get_shot_voice(shot, voice_map),
             "character": character,
             "shot": shot.get("shot")
         })
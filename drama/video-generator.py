@@ -46,20 +46,14 @@ def generate_video_from_image(image_path, prompt="", duration=2):
         print(f"❌ API错误: {response.status_code}")
         return generate_video_placeholder(image_path, prompt)
 
-def generate_video_placeholder(image_path, prompt):
+def generate_video_placeholder(image_path, prompt, camera="近景"):
     """生成占位视频（用于测试）"""
-    import subprocess
+    from motion import render_motion_clip
     
     output_path = f"{OUTPUT_DIR}/video_{int(time.time())}.mp4"
     
-    # 使用ffmpeg从图片生成短视频（带简单动画）
-    subprocess.run([
-        'ffmpeg', '-y',
-        '-loop', '1', '-i', image_path,
-        '-c:v', 'libx264', '-t', '4',
-        '-vf', 'zoompan=z=1.2:d=4:s=720x1280',
-        '-shortest', output_path
-    ], capture_output=True)
+    # 使用ffmpeg从图片生成短视频（按景别运镜）
+    render_motion_clip(image_path, output_path, camera, duration=4)
     
     return output_path
 
@@ -0,0 +1,216 @@
+"""
+Artifact Trail Index
+
+Tracks which files were created, modified and read, outside of any
+compression, so the artifact trail survives however aggressively the
+conversation itself is summarized.
+
+The index is fed transcript spans as they happen and only ever appends:
+each file operation becomes an event in a turn-ordered log, and per-path
+records (operations, first/last turn, recent change summaries) are kept
+in a path-sorted list. Lookups by path prefix or by turn are binary
+searches. render() produces a compact table to inject into a compressed
+context.
+
+Usage:
+    python artifact_index.py <transcript_file> [span_lines]
+"""
+
+import bisect
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from compression_evaluator import FILE_OPERATIONS, FILE_PATTERNS, FactExtractor, normalize_path
+
+
+# What follows the path on its line is kept as the change summary
+_DETAIL = re.compile(r"[ \t:]*([^\n]*)")
+
+_RANK = {op: rank for rank, op in enumerate(FILE_OPERATIONS)}
+
+
+@dataclass
+class ArtifactEvent:
+    """One file operation seen in the transcript."""
+    turn: int
+    path: str
+    operation: str
+    detail: str = ""
+
+
+@dataclass
+class ArtifactRecord:
+    """Everything known about one path."""
+    path: str
+    first_turn: int
+    last_turn: int
+    operations: Dict[str, int] = field(default_factory=dict)
+    changes: List[str] = field(default_factory=list)
+
+    @property
+    def kind(self) -> str:
+        """Strongest operation seen: modified > created > read."""
+        return min(self.operations, key=_RANK.__getitem__)
+
+
+class ArtifactIndex:
+    """Append-only index of file operations by path and by turn."""
+
+    def __init__(self, max_changes: int = 3):
+        """
+        Args:
+            max_changes: Change summaries kept per path (latest win)
+        """
+        self.max_changes = max_changes
+        self.turn = 0
+        self.events: List[ArtifactEvent] = []
+        self._event_turns: List[int] = []
+        self._paths: List[str] = []
+        self._records: Dict[str, ArtifactRecord] = {}
+        self._saved = 0
+
+    def feed(self, span: str, turn: Optional[int] = None) -> List[ArtifactEvent]:
+        """
+        Index the file operations in a transcript span.
+
+        turn defaults to one past the previous span's; turns must not go
+        backwards. Returns the events added.
+        """
+        if turn is None:
+            turn = self.turn + 1
+        elif turn < self.turn:
+            raise ValueError(f"Turn {turn} is before the last indexed turn {self.turn}")
+        self.turn = turn
+
+        hits = []
+
+        def on_fact(position, kind, fact, label):
+            if kind == "file":
+                hits.append((position, fact, label))
+
+        # Same rules and keyword handling as compression_evaluator's file facts
+        FactExtractor(on_fact=on_fact).scan(span)
+
+        added = []
+        for position, path, operation in hits:
+            end = FILE_PATTERNS[operation].match(span, position).end()
+            event = ArtifactEvent(
+                turn=turn,
+                path=path,
+                operation=operation,
+                detail=_DETAIL.match(span, end).group(1).strip()[:100]
+            )
+            self._append(event)
+            added.append(event)
+        return added
+
+    def _append(self, event: ArtifactEvent) -> None:
+        self.events.append(event)
+        self._event_turns.append(event.turn)
+
+        record = self._records.get(event.path)
+        if record is None:
+            record = ArtifactRecord(event.path, event.turn, event.turn)
+            self._records[event.path] = record
+            bisect.insort(self._paths, event.path)
+        record.last_turn = event.turn
+        record.operations[event.operation] = record.operations.get(event.operation, 0) + 1
+        if event.operation != "read" and event.detail:
+            record.changes.append(event.detail)
+            del record.changes[:-self.max_changes]
+
+    def get(self, path: str) -> Optional[ArtifactRecord]:
+        """Record for a path, if it was ever seen."""
+        return self._records.get(normalize_path(path))
+
+    def under(self, prefix: str) -> List[ArtifactRecord]:
+        """Records whose path starts with prefix, in path order."""
+        start = bisect.bisect_left(self._paths, prefix)
+        end = bisect.bisect_left(self._paths, prefix + "\U0010ffff", start)
+        return [self._records[path] for path in self._paths[start:end]]
+
+    def since(self, turn: int) -> List[ArtifactEvent]:
+        """Events from turn onwards, in order."""
+        return self.events[bisect.bisect_left(self._event_turns, turn):]
+
+    def touched_since(self, turn: int) -> List[ArtifactRecord]:
+        """Records with any operation from turn onwards."""
+        paths = dict.fromkeys(event.path for event in self.since(turn))
+        return [self._records[path] for path in paths]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def render(self, max_rows: int = 50, include_read: bool = True) -> str:
+        """
+        Compact markdown table of the artifact trail.
+
+        Created and modified files come first, most recently touched first;
+        read-only files fill the remaining rows.
+        """
+        records = [
+            r for r in self._records.values()
+            if include_read or r.kind != "read"
+        ]
+        records.sort(key=lambda r: (r.kind == "read", -r.last_turn, r.path))
+        if not records:
+            return "## Artifact Trail\nNone"
+
+        lines = [
+            "## Artifact Trail",
+            "| path | ops | turns | latest change |",
+            "|---|---|---|---|",
+        ]
+        for record in records[:max_rows]:
+            ops = ",".join(
+                f"{op}x{n}" if n > 1 else op
+                for op, n in sorted(record.operations.items(), key=lambda item: _RANK[item[0]])
+            )
+            turns = (str(record.first_turn) if record.first_turn == record.last_turn
+                     else f"{record.first_turn}-{record.last_turn}")
+            change = record.changes[-1].replace("|", "/") if record.changes else ""
+            lines.append(f"| {record.path} | {ops} | {turns} | {change} |")
+        if len(records) > max_rows:
+            lines.append(f"| ... {len(records) - max_rows} more | | | |")
+        return "\n".join(lines)
+
+    def inject(self, compressed_context: str, max_rows: int = 50) -> str:
+        """Append the artifact table to a compressed context."""
+        return compressed_context.rstrip("\n") + "\n\n" + self.render(max_rows) + "\n"
+
+    def save(self, path: str) -> None:
+        """Append events not yet saved to a JSONL log."""
+        with open(path, "a", encoding="utf-8") as f:
+            for event in self.events[self._saved:]:
+                f.write(json.dumps(event.__dict__) + "\n")
+        self._saved = len(self.events)
+
+    @classmethod
+    def load(cls, path: str, max_changes: int = 3) -> "ArtifactIndex":
+        """Rebuild an index by replaying a JSONL event log."""
+        index = cls(max_changes=max_changes)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    event = ArtifactEvent(**json.loads(line))
+                    index.turn = max(index.turn, event.turn)
+                    index._append(event)
+        index._saved = len(index.events)
+        return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    span_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with open(sys.argv[1], encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    index = ArtifactIndex()
+    for i in range(0, len(lines), span_lines):
+        index.feed("\n".join(lines[i:i + span_lines]))
+    print(index.render())
@@ -0,0 +1,184 @@
+"""
+Batch Compression Evaluation
+
+Evaluates a JSONL dataset of compressed sessions in a process pool,
+streaming one result row per probe to a JSONL file and aggregating
+summary statistics online, so memory stays flat however large the
+dataset is.
+
+Each input line is a session:
+    {"session_id": "...",
+     "original_history": "...",
+     "compressed_context": "...",
+     "responses": {"recall": "...", "artifact": "...",
+                   "continuation": "...", "decision": "..."}}
+
+responses are keyed by probe type; probes without a response are
+skipped and counted in the summary.
+
+Usage:
+    python batch_evaluate.py sessions.jsonl results.jsonl [--workers N]
+        [--judge-url URL] [--model NAME] [--cache PATH] [--pack]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+from compression_evaluator import CompressionEvaluator, ProbeGenerator, SummaryStats
+from token_accounting import TokenAccounting
+
+
+# Per-process evaluator, created by _init_worker
+_EVALUATOR: Optional[CompressionEvaluator] = None
+
+
+def _init_worker(options: Dict) -> None:
+    global _EVALUATOR
+    judge = None
+    if options.get("judge_url"):
+        from judge import HTTPJudge
+        judge = HTTPJudge(options["judge_url"], model=options["model"],
+                          api_key=os.environ.get("JUDGE_API_KEY"))
+    cache = None
+    if options.get("cache"):
+        from judge_cache import JudgeCache
+        cache = JudgeCache(options["cache"])
+    _EVALUATOR = CompressionEvaluator(
+        model=options["model"],
+        judge=judge,
+        max_concurrency=options["concurrency"],
+        pack_criteria=options["pack"],
+        cache=cache,
+        keep_results=False
+    )
+
+
+def evaluate_session(line: str) -> Dict:
+    """Evaluate one dataset line; returns its result rows, skip count and tokens."""
+    session = json.loads(line)
+    session_id = session.get("session_id")
+    responses = session.get("responses") or {}
+    context = session.get("compressed_context", "")
+    history = session.get("original_history", "")
+    tokens = _EVALUATOR.record_compression(history, context)
+
+    probes = ProbeGenerator(history).generate_probes()
+    items = [
+        (probe, responses[probe.probe_type.value], context)
+        for probe in probes if probe.probe_type.value in responses
+    ]
+    results = asyncio.run(_EVALUATOR.evaluate_many_async(items)) if items else []
+    rows = [
+        {
+            "session_id": session_id,
+            "probe_type": result.probe.probe_type.value,
+            "question": result.probe.question,
+            "aggregate_score": result.aggregate_score,
+            "dimension_scores": result.dimension_scores,
+            "compressed_tokens": tokens["compressed_tokens"],
+            "criteria": {r.criterion_id: r.score for r in result.criterion_results}
+        }
+        for result in results
+    ]
+    return {
+        "rows": rows,
+        "skipped": len(probes) - len(items),
+        "tokens": (tokens["original_tokens"], tokens["compressed_tokens"])
+    }
+
+
+def _lines(path: str) -> Iterable[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def run_batch(dataset: str,
+              output: str,
+              workers: Optional[int] = None,
+              options: Optional[Dict] = None,
+              max_pending: Optional[int] = None) -> Dict:
+    """
+    Evaluate every session in dataset, writing rows to output.
+
+    At most max_pending sessions are read ahead of the pool, and rows
+    are written in completion order as soon as a session finishes.
+    Returns the online summary with session, failure and skip counts
+    and token accounting.
+    """
+    options = dict({"model": "gpt-5.2", "concurrency": 8, "pack": False}, **(options or {}))
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    stats = SummaryStats()
+    tokens = TokenAccounting()
+    counts = {"sessions": 0, "failed_sessions": 0, "skipped_probes": 0}
+    start = time.perf_counter()
+
+    def collect(done) -> None:
+        for future in done:
+            counts["sessions"] += 1
+            try:
+                outcome = future.result()
+            except Exception as e:
+                counts["failed_sessions"] += 1
+                print(f"Session failed: {e}", file=sys.stderr)
+                continue
+            counts["skipped_probes"] += outcome["skipped"]
+            tokens.add(*outcome["tokens"])
+            for row in outcome["rows"]:
+                stats.add(row["aggregate_score"], row["dimension_scores"])
+                out.write(json.dumps(row) + "\n")
+
+    with open(output, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        pending = set()
+        for line in _lines(dataset):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(evaluate_session, line))
+        collect(wait(pending)[0])
+
+    summary = stats.summary()
+    summary.update(counts)
+    summary["tokens"] = tokens.summary(summary.get("average_score"))
+    summary["elapsed_seconds"] = time.perf_counter() - start
+    return summary
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Evaluate a JSONL dataset of compressed sessions")
+    parser.add_argument("dataset", help="Input JSONL, one session per line")
+    parser.add_argument("output", help="Output JSONL, one row per evaluated probe")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--judge-url", help="OpenAI-compatible base URL (default: heuristic judge)")
+    parser.add_argument("--model", default="gpt-5.2", help="Judge model name")
+    parser.add_argument("--cache", help="SQLite judge cache path")
+    parser.add_argument("--concurrency", type=int, default=8, help="Judge calls in flight per worker")
+    parser.add_argument("--pack", action="store_true", help="Send all criteria for a probe in one call")
+    parser.add_argument("--summary", help="Also write the summary JSON to this path")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.dataset, args.output, args.workers, {
+        "judge_url": args.judge_url,
+        "model": args.model,
+        "cache": args.cache,
+        "concurrency": args.concurrency,
+        "pack": args.pack,
+    })
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,101 @@
+"""
+Probe Extraction Benchmark
+
+Times ProbeGenerator fact extraction on large synthetic agent transcripts
+against the per-pattern approach it replaced (one re.search/re.findall
+traversal per pattern, patterns compiled on every call).
+
+Usage:
+    python bench_extraction.py [size_mb ...]
+"""
+
+import random
+import re
+import sys
+import time
+
+from compression_evaluator import ProbeGenerator
+
+
+_TURNS = [
+    "User: the build fails with error: cannot find module 'redis' in {path}\n",
+    "Assistant: I read {path} and examined the imports.\n",
+    "Assistant: I modified {path} to use the connection pool.\n",
+    "Assistant: created {path} with the new retry helper.\n",
+    "Assistant: We decided to keep the existing schema for now.\n",
+    "Assistant: going with exponential backoff because the API rate limits.\n",
+    "Tool: 401 Unauthorized returned by the auth service\n",
+    "Assistant: next: run the integration tests against staging\n",
+    "Tool: ran 42 tests, 40 passed, 2 failed in {path}\n",
+    "Assistant: Looking at the stack trace, the failure happens during setup.\n",
+]
+
+
+def synthetic_transcript(size_mb: float, seed: int = 0) -> str:
+    """Generate a transcript of roughly size_mb megabytes."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    while length < target:
+        path = f"src/module_{rng.randrange(5000)}/file_{rng.randrange(50)}.py"
+        turn = rng.choice(_TURNS).format(path=path)
+        parts.append(turn)
+        length += len(turn)
+    return "".join(parts)
+
+
+def legacy_extract(history: str):
+    """Per-pattern extraction as previously done in ProbeGenerator."""
+    facts = {}
+    for pattern in [r"error[:\s]+(.+?)(?:\n|$)",
+                    r"(\d{3})\s+(Unauthorized|Not Found|Internal Server Error)",
+                    r"exception[:\s]+(.+?)(?:\n|$)"]:
+        match = re.search(pattern, history, re.IGNORECASE)
+        if match:
+            facts["original_error"] = match.group(0).strip()
+            break
+    for pattern in [r"next[:\s]+(.+?)(?:\n|$)", r"TODO[:\s]+(.+?)(?:\n|$)",
+                    r"remaining[:\s]+(.+?)(?:\n|$)"]:
+        match = re.search(pattern, history, re.IGNORECASE)
+        if match:
+            facts["next_steps"] = match.group(0).strip()
+            break
+
+    # The original deduplicated with a list scan per match (quadratic); a set
+    # keeps the baseline to its per-pattern traversals
+    files = []
+    seen = set()
+    for pattern in [r"(?:modified|changed|updated|edited)\s+([^\s]+\.[a-z]+)",
+                    r"(?:created|added)\s+([^\s]+\.[a-z]+)",
+                    r"(?:read|examined|opened)\s+([^\s]+\.[a-z]+)"]:
+        for match in re.findall(pattern, history, re.IGNORECASE):
+            if match not in seen:
+                seen.add(match)
+                files.append({"path": match})
+
+    decisions = []
+    for pattern in [r"decided to\s+(.+?)(?:\n|$)", r"chose\s+(.+?)(?:\n|$)",
+                    r"going with\s+(.+?)(?:\n|$)", r"will use\s+(.+?)(?:\n|$)"]:
+        decisions.extend(re.findall(pattern, history, re.IGNORECASE))
+    return facts, files, decisions[:5]
+
+
+def _time(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'size':>8} {'single-pass':>12} {'legacy':>10} {'speedup':>8}")
+    for size_mb in sizes:
+        text = synthetic_transcript(size_mb)
+        new = _time(ProbeGenerator, text)
+        legacy = _time(legacy_extract, text)
+        speedup = legacy / new
+        print(f"{size_mb:>6.1f}MB {new:>11.3f}s {legacy:>9.3f}s {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([float(a) for a in sys.argv[1:]] or [0.5, 1, 2, 10])
@@ -0,0 +1,256 @@
+"""
+Compression Strategy Benchmark
+
+Applies several compression strategies to a corpus of transcripts,
+evaluates each compressed context with ProbeGenerator and
+CompressionEvaluator, and prints a quality / size / latency table with
+the Pareto-optimal strategies (best score for their size) marked.
+
+Without a model, probes are answered from the compressed context alone:
+the response is what ProbeGenerator can still recover from it. That
+measures how much probe-relevant information survives compression. Pass
+a respond function (same signature as evaluate_compression_quality's
+model_response_fn) to benchmark real model answers instead.
+
+Usage:
+    python compression_benchmark.py [--budget TOKENS] [corpus ...]
+
+corpus entries are transcript text files or JSONL files with an
+"original_history" field per line. Without a corpus a synthetic one is
+generated.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from compression_evaluator import (
+    CompressionEvaluator,
+    ProbeGenerator,
+    StructuredSummarizer,
+)
+from extractive import ExtractiveCompressor, extract_then_summarize
+from token_accounting import get_tokenizer
+
+
+# A compressor maps (history, token budget, tokenizer) to a compressed context
+Compressor = Callable[[str, int, object], str]
+
+
+def _tail_lines(lines: List[str], budget: int, tokenizer) -> List[str]:
+    """Latest lines that fit in budget tokens."""
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = tokenizer.count(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+def truncate(history: str, budget: int, tokenizer) -> str:
+    """Keep the most recent turns that fit the budget."""
+    return "\n".join(_tail_lines(history.splitlines(), budget, tokenizer))
+
+
+def head_tail(history: str, budget: int, tokenizer) -> str:
+    """Keep the opening turns (a quarter of the budget) and the most recent ones."""
+    lines = history.splitlines()
+    head, used = [], 0
+    for line in lines:
+        cost = tokenizer.count(line) + 1
+        if used + cost > budget // 4:
+            break
+        head.append(line)
+        used += cost
+    tail = _tail_lines(lines[len(head):], budget - used, tokenizer)
+    return "\n".join(head + ["[...]"] + tail)
+
+
+def anchored(history: str, budget: int, tokenizer) -> str:
+    """
+    Anchored iterative summary of older turns plus recent turns verbatim.
+
+    Half the budget goes to the StructuredSummarizer summary, built span by
+    span, and the rest to the latest turns.
+    """
+    lines = history.splitlines()
+    recent = _tail_lines(lines, budget // 2, tokenizer)
+    older = lines[:len(lines) - len(recent)]
+    summarizer = StructuredSummarizer(token_budget=budget // 2, tokenizer=tokenizer)
+    summary = ""
+    span = 50
+    for i in range(0, len(older), span):
+        summary = summarizer.update_from_span("\n".join(older[i:i + span]))
+    return summary + "\n".join(recent)
+
+
+_SALIENT = re.compile(
+    r"error|exception|unauthorized|not found|next|todo|remaining|decided|chose|"
+    r"going with|will use|modified|changed|updated|edited|created|added|read|"
+    r"examined|opened|\S+\.[a-z]{1,4}\b",
+    re.IGNORECASE
+)
+
+
+def extractive_top_k(history: str, budget: int, tokenizer) -> str:
+    """
+    Keep the highest-scoring turns within the budget, in original order.
+
+    Turns score by salient terms (errors, file operations, decisions, next
+    steps) with a mild recency bonus; duplicates are kept once.
+    """
+    lines = history.splitlines()
+    n = len(lines)
+    seen = set()
+    scored = []
+    for i, line in enumerate(lines):
+        if not line.strip() or line in seen:
+            continue
+        seen.add(line)
+        score = len(_SALIENT.findall(line)) + i / max(n, 1)
+        scored.append((score, i))
+    scored.sort(reverse=True)
+
+    kept, used = [], 0
+    for _, i in scored:
+        cost = tokenizer.count(lines[i]) + 1
+        if used + cost <= budget:
+            kept.append(i)
+            used += cost
+    return "\n".join(lines[i] for i in sorted(kept))
+
+
+def bm25_extractive(history: str, budget: int, tokenizer) -> str:
+    """BM25/recency/path/error extractive selection (extractive.py)."""
+    return ExtractiveCompressor(budget, tokenizer=tokenizer).compress(history)
+
+
+def bm25_summary(history: str, budget: int, tokenizer) -> str:
+    """Extractive pass feeding an anchored structured summary (extractive.py)."""
+    return extract_then_summarize(history, budget, tokenizer=tokenizer)
+
+
+COMPRESSORS: Dict[str, Compressor] = {
+    "truncate": truncate,
+    "head_tail": head_tail,
+    "anchored": anchored,
+    "extractive_top_k": extractive_top_k,
+    "bm25_extractive": bm25_extractive,
+    "bm25_summary": bm25_summary,
+}
+
+
+def recovered_answer(context: str, question: str) -> str:
+    """Answer a probe with what ProbeGenerator recovers from the context."""
+    for probe in ProbeGenerator(context).generate_probes():
+        if probe.question == question:
+            return probe.ground_truth or ""
+    return ""
+
+
+def benchmark(corpus: List[str],
+              budget: int,
+              compressors: Optional[Dict[str, Compressor]] = None,
+              respond: Callable[[str, str], str] = recovered_answer,
+              tokenizer=None) -> List[Dict]:
+    """Score every compressor on the corpus; one result row per compressor."""
+    compressors = compressors or COMPRESSORS
+    tokenizer = tokenizer or get_tokenizer()
+    probe_sets = [ProbeGenerator(history).generate_probes() for history in corpus]
+
+    rows = []
+    for name, compress in compressors.items():
+        evaluator = CompressionEvaluator(keep_results=False, tokenizer=tokenizer)
+        compress_seconds = evaluate_seconds = 0.0
+        for history, probes in zip(corpus, probe_sets):
+            start = time.perf_counter()
+            compressed = compress(history, budget, tokenizer)
+            compress_seconds += time.perf_counter() - start
+
+            evaluator.record_compression(history, compressed)
+            start = time.perf_counter()
+            evaluator.evaluate_many([
+                (probe, respond(compressed, probe.question), compressed)
+                for probe in probes
+            ])
+            evaluate_seconds += time.perf_counter() - start
+
+        summary = evaluator.get_summary()
+        tokens = summary["tokens"]
+        rows.append({
+            "strategy": name,
+            "score": summary["average_score"],
+            "artifact_trail": summary["dimension_averages"].get("artifact_trail", 0.0),
+            "tokens": tokens["compressed_tokens"] / tokens["sessions"],
+            "ratio": tokens["compression_ratio"],
+            "compress_ms": compress_seconds / len(corpus) * 1000,
+            "evaluate_ms": evaluate_seconds / len(corpus) * 1000,
+        })
+    mark_pareto(rows)
+    return rows
+
+
+def mark_pareto(rows: List[Dict]) -> None:
+    """Flag rows not dominated on (higher score, fewer tokens)."""
+    for row in rows:
+        row["pareto"] = not any(
+            other["score"] >= row["score"] and other["tokens"] <= row["tokens"]
+            and (other["score"] > row["score"] or other["tokens"] < row["tokens"])
+            for other in rows
+        )
+
+
+def format_table(rows: List[Dict]) -> str:
+    lines = [
+        f"{'strategy':<18} {'score':>6} {'artifact':>8} {'tokens':>8} {'ratio':>7} "
+        f"{'compress':>10} {'evaluate':>10}  pareto"
+    ]
+    for row in sorted(rows, key=lambda r: -r["score"]):
+        lines.append(
+            f"{row['strategy']:<18} {row['score']:>6.2f} {row['artifact_trail']:>8.2f} "
+            f"{row['tokens']:>8.0f} {row['ratio']:>6.1f}x "
+            f"{row['compress_ms']:>8.1f}ms {row['evaluate_ms']:>8.1f}ms  "
+            f"{'*' if row['pareto'] else ''}"
+        )
+    return "\n".join(lines)
+
+
+def load_corpus(paths: List[str]) -> List[str]:
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                corpus.extend(
+                    json.loads(line)["original_history"] for line in f if line.strip()
+                )
+            else:
+                corpus.append(f.read())
+    return corpus
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Compare compression strategies")
+    parser.add_argument("corpus", nargs="*", help="Transcript .txt or session .jsonl files")
+    parser.add_argument("--budget", type=int, default=2000, help="Token budget per context")
+    parser.add_argument("--synthetic", type=int, default=20,
+                        help="Synthetic transcripts to generate when no corpus is given")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        from bench_extraction import synthetic_transcript
+        corpus = [synthetic_transcript(0.05, seed=i) for i in range(args.synthetic)]
+
+    print(f"{len(corpus)} transcripts, budget {args.budget} tokens")
+    print(format_table(benchmark(corpus, args.budget)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
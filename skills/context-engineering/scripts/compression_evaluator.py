@@ -5,19 +5,37 @@ This module provides utilities for evaluating context compression quality
 using probe-based assessment.
 
 PRODUCTION NOTES:
-- The LLM judge calls are stubbed for demonstration. Production systems
-  should implement actual API calls to GPT-5.2 or equivalent.
-- Token estimation uses simplified heuristics. Production systems should
-  use model-specific tokenizers.
+- The default judge is a heuristic stub for demonstration. Production
+  systems should plug in an LLM judge backend (see judge.py for an
+  OpenAI-compatible HTTP judge) calling GPT-5.2 or equivalent.
+- Token counts use tiktoken when installed and fall back to a heuristic
+  estimate otherwise (see token_accounting.py).
 - Ground truth extraction uses pattern matching. Production systems may
   benefit from more sophisticated fact extraction.
 """
 
+from array import array
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from enum import Enum
+import asyncio
 import json
+import posixpath
+import random
 import re
+import string
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from judge_cache import content_digest
+from token_accounting import TokenAccounting, get_tokenizer
+
+try:
+    import numpy as np
+except ImportError:  # Batch scoring falls back to pure Python
+    np = None
 
 
 class ProbeType(Enum):
@@ -27,7 +45,7 @@ class ProbeType(Enum):
     DECISION = "decision"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Probe:
     """A probe question for evaluating compression quality."""
     probe_type: ProbeType
@@ -36,20 +54,25 @@ class Probe:
     context_reference: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CriterionResult:
     """Result for a single evaluation criterion."""
     criterion_id: str
     score: float
     reasoning: str
+    local: bool = False  # Pre-scored locally, without a judge verdict
+    
+    def __post_init__(self):
+        # Ids repeat across every result; share one string per id
+        object.__setattr__(self, "criterion_id", sys.intern(self.criterion_id))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EvaluationResult:
     """Complete evaluation result for a probe response."""
     probe: Probe
     response: str
-    criterion_results: List[CriterionResult]
+    criterion_results: Tuple[CriterionResult, ...]
     aggregate_score: float
     dimension_scores: Dict[str, float] = field(default_factory=dict)
 
@@ -142,14 +165,442 @@ RUBRIC_CRITERIA = {
 }
 
 
+class CompiledRubric:
+    """
+    Rubric flattened into index tables, built once.
+    
+    Each criterion id maps to a column with its weight and the index of its
+    dimension, so scoring a result is a dict lookup per criterion rather
+    than a scan of the rubric.
+    """
+    
+    def __init__(self, rubric: Dict[str, List[Dict]] = RUBRIC_CRITERIA):
+        self.dimensions = list(rubric)
+        self.criterion_ids = [c["id"] for criteria in rubric.values() for c in criteria]
+        self.column = {cid: i for i, cid in enumerate(self.criterion_ids)}
+        self.weights = [c["weight"] for criteria in rubric.values() for c in criteria]
+        self.dimension_of = [
+            d for d, criteria in enumerate(rubric.values()) for _ in criteria
+        ]
+        if np is not None:
+            self._weights = np.asarray(self.weights, dtype=float)
+            # (criteria x dimensions) one-hot membership
+            self._membership = np.zeros((len(self.criterion_ids), len(self.dimensions)))
+            self._membership[np.arange(len(self.criterion_ids)), self.dimension_of] = 1.0
+    
+    def dimension_scores(self, criterion_results: List[CriterionResult]) -> Dict[str, float]:
+        """Weighted average score per dimension that has results."""
+        weighted = [0.0] * len(self.dimensions)
+        totals = [0.0] * len(self.dimensions)
+        present = [False] * len(self.dimensions)
+        for result in criterion_results:
+            column = self.column.get(result.criterion_id)
+            if column is None:
+                continue
+            d = self.dimension_of[column]
+            weighted[d] += result.score * self.weights[column]
+            totals[d] += self.weights[column]
+            present[d] = True
+        return {
+            dim: weighted[d] / totals[d] if totals[d] > 0 else 0.0
+            for d, dim in enumerate(self.dimensions) if present[d]
+        }
+    
+    def score_batch(self, batch: List[List[CriterionResult]]):
+        """
+        Dimension and aggregate scores for many evaluations at once.
+        
+        Returns (dimension_scores, aggregate_scores): an evaluations x
+        dimensions matrix with NaN where a dimension had no results, in
+        the order of self.dimensions, and the mean of each row's present
+        dimensions. NumPy arrays when NumPy is installed, else lists.
+        """
+        if np is None:
+            return self._score_batch_python(batch)
+        
+        scores = np.zeros((len(batch), len(self.criterion_ids)))
+        mask = np.zeros_like(scores)
+        rows, columns, values = [], [], []
+        for row, results in enumerate(batch):
+            for result in results:
+                column = self.column.get(result.criterion_id)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(result.score)
+        scores[rows, columns] = values
+        mask[rows, columns] = 1.0
+        
+        weighted = (scores * self._weights) @ self._membership
+        totals = (mask * self._weights) @ self._membership
+        present = (mask @ self._membership) > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dimension_scores = np.where(totals > 0, weighted / totals, 0.0)
+            dimension_scores[~present] = np.nan
+            counts = present.sum(axis=1)
+            aggregate = np.where(
+                counts > 0, np.nansum(dimension_scores, axis=1) / counts, np.nan
+            )
+        return dimension_scores, aggregate
+    
+    def _score_batch_python(self, batch: List[List[CriterionResult]]):
+        nan = float("nan")
+        matrix, aggregate = [], []
+        for results in batch:
+            scores = self.dimension_scores(results)
+            matrix.append([scores.get(dim, nan) for dim in self.dimensions])
+            aggregate.append(sum(scores.values()) / len(scores) if scores else nan)
+        return matrix, aggregate
+
+
+DEFAULT_RUBRIC = CompiledRubric()
+
+
+# Fact Extraction Rules
+#
+# Each rule is (kind, keywords, pattern, label). The history is scanned once
+# with a flat alternation of every rule's lowercase keywords over an
+# ASCII-lowercased copy; each hit is dispatched by the keyword's first three
+# characters (unique across rules) to the one rule pattern that applies,
+# matched against the original text. Keywords that can start inside another
+# keyword (e.g. "read" + "added") are re-checked at the precomputed offsets,
+# so the result is the same as running every pattern over the text
+# separately. The status-code rule is triggered by its phrase and matched
+# from the digits that precede it.
+
+_FACT_RULES = [
+    ("error", ("error",), r"error[:\s]+(.+?)(?:\n|$)", None),
+    ("error", ("unauthorized", "not found", "internal server error"),
+     r"(\d{3})\s+(Unauthorized|Not Found|Internal Server Error)", None),
+    ("error", ("exception",), r"exception[:\s]+(.+?)(?:\n|$)", None),
+    ("next_steps", ("next",), r"next[:\s]+(.+?)(?:\n|$)", None),
+    ("next_steps", ("todo",), r"TODO[:\s]+(.+?)(?:\n|$)", None),
+    ("next_steps", ("remaining",), r"remaining[:\s]+(.+?)(?:\n|$)", None),
+    ("file", ("modified", "changed", "updated", "edited"),
+     r"(?:modified|changed|updated|edited)\s+([^\s]+\.[a-z]+)", "modified"),
+    ("file", ("created", "added"), r"(?:created|added)\s+([^\s]+\.[a-z]+)", "created"),
+    ("file", ("read", "examined", "opened"), r"(?:read|examined|opened)\s+([^\s]+\.[a-z]+)", "read"),
+    ("decision", ("decided to",), r"decided to\s+(.+?)(?:\n|$)", "decided to"),
+    ("decision", ("chose",), r"chose\s+(.+?)(?:\n|$)", "chose"),
+    ("decision", ("going with",), r"going with\s+(.+?)(?:\n|$)", "going with"),
+    ("decision", ("will use",), r"will use\s+(.+?)(?:\n|$)", "will use"),
+]
+
+_RULE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for _, _, pattern, _ in _FACT_RULES]
+
+_STATUS_RULE = 1
+
+_KEYWORDS = [keyword for _, keywords, _, _ in _FACT_RULES for keyword in keywords]
+
+_RULE_BY_PREFIX = {
+    keyword[:3]: index
+    for index, (_, keywords, _, _) in enumerate(_FACT_RULES)
+    for keyword in keywords
+}
+
+
+
+def _prefix_alternation(words: List[str]) -> str:
+    """Alternation of words grouped by shared prefix ("c(?:hose|reated)").
+    
+    re tries every branch of a flat alternation at each candidate offset;
+    nesting by first letter rejects most offsets after one comparison. No
+    keyword is a prefix of another, so the matches are the same.
+    """
+    groups: Dict[str, List[str]] = {}
+    for word in words:
+        groups.setdefault(word[0], []).append(word[1:])
+    branches = [
+        re.escape(first) + (re.escape(rest[0]) if len(rest) == 1 else _prefix_alternation(rest))
+        for first, rest in sorted(groups.items())
+    ]
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+
+_KEYWORD_PATTERN = re.compile(_prefix_alternation(_KEYWORDS))
+
+
+def _keyword_overlaps(keyword: str) -> Tuple[List[int], Tuple[str, ...]]:
+    """Offsets inside keyword at which another keyword could also start.
+    
+    Also returns the texts that must follow the hit position for any of those
+    overlaps to be real, so the common case is rejected with one startswith.
+    """
+    offsets, probes = [], []
+    for offset in range(1, len(keyword)):
+        for other in _KEYWORDS:
+            if other[:len(keyword) - offset] == keyword[offset:offset + len(other)]:
+                if offset not in offsets:
+                    offsets.append(offset)
+                probes.append(keyword[:offset] + other if len(other) > len(keyword) - offset else keyword)
+    return offsets, tuple(probes)
+
+
+_OVERLAPS = {keyword: _keyword_overlaps(keyword) for keyword in _KEYWORDS}
+
+_MAX_KEYWORD = max(len(k) for k in _KEYWORDS)
+
+# Chunk boundaries: a hit is settled once nothing after the buffer end can
+# change its match. Every rule except the status code is keyword + separator
+# run + body; the outcome is fixed when the separator run ends inside the
+# buffer and the body's terminator (newline for text, whitespace for paths)
+# appears after it. Status matches end at the phrase and are always settled.
+_COLON_SPACE_RUN = re.compile(r"[:\s]*")
+_SPACE_RUN = re.compile(r"\s*")
+_NEWLINE = re.compile(r"\n")
+_WHITESPACE = re.compile(r"\s")
+
+_RULE_BOUNDARIES = [
+    None if index == _STATUS_RULE else (
+        _SPACE_RUN if kind in ("file", "decision") else _COLON_SPACE_RUN,
+        _WHITESPACE if kind == "file" else _NEWLINE,
+    )
+    for index, (kind, _, _, _) in enumerate(_FACT_RULES)
+]
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+_MAX_DECISIONS = 5
+
+# Operation precedence when the same path is seen more than once
+FILE_OPERATIONS = ("modified", "created", "read")
+
+# File-operation pattern per operation, for callers that re-match an
+# on_fact hit (e.g. to read what follows the path)
+FILE_PATTERNS = {
+    label: pattern
+    for (kind, _, _, label), pattern in zip(_FACT_RULES, _RULE_PATTERNS)
+    if kind == "file"
+}
+
+_PATH_STRIP = "'\"`([<{"
+
+
+def normalize_path(path: str) -> str:
+    """Canonical key for a file path mention (quotes stripped, ./ and // collapsed)."""
+    path = path.lstrip(_PATH_STRIP)
+    if "//" not in path and "/." not in path and not path.startswith("."):
+        return path  # Already canonical (the common case)
+    if "://" in path:
+        return path
+    return posixpath.normpath(path)
+
+
+class FactExtractor:
+    """Single-pass extraction of facts, file operations and decisions."""
+    
+    def __init__(self, on_fact=None):
+        """
+        Args:
+            on_fact: Optional callback(position, kind, fact, label) called for
+                every match of every rule, in order, not only the ones kept
+                for facts()/files()/decisions(); position is the absolute
+                offset of the match
+        """
+        self._on_fact = on_fact
+        self._base = 0
+        # Streaming state: unsettled text is held back in _tail, which starts
+        # at absolute offset _offset; hits before _scanned_to are done
+        self._tail = ""
+        self._offset = 0
+        self._scanned_to = 0
+        self._rule_end = [0] * len(_FACT_RULES)
+        self._first_match: Dict[int, str] = {}
+        # One ordered index per operation; a path lives in exactly one of them
+        self._files: Dict[str, Dict[str, None]] = {op: {} for op in FILE_OPERATIONS}
+        self._decisions: Dict[int, List[str]] = {
+            i: [] for i, rule in enumerate(_FACT_RULES) if rule[0] == "decision"
+        }
+    
+    def scan(self, text: str) -> None:
+        """Scan text to the end, as if it completes the transcript."""
+        self._scan(text, final=True)
+    
+    def feed(self, chunk: str) -> None:
+        """Scan the next chunk of a transcript.
+        
+        Hits whose match could still change with more input (e.g. a line
+        without its newline yet) are held back and rescanned with the next
+        chunk, so feeding a transcript in any split gives the same result
+        as scanning it whole. Work per call is proportional to the chunk
+        plus the held-back tail (at most the last line).
+        """
+        self._scan(chunk, final=False)
+    
+    def flush(self) -> None:
+        """Settle the held-back tail as if the transcript ended here."""
+        self._scan("", final=True)
+    
+    def snapshot(self) -> "FactExtractor":
+        """Copy of the current state with the held-back tail settled."""
+        copy = FactExtractor()  # Without on_fact: settling the tail must not report twice
+        copy._tail = self._tail
+        copy._offset = self._offset
+        copy._scanned_to = self._scanned_to
+        copy._rule_end = list(self._rule_end)
+        copy._first_match = dict(self._first_match)
+        copy._files = {op: dict(paths) for op, paths in self._files.items()}
+        copy._decisions = {i: list(items) for i, items in self._decisions.items()}
+        copy.flush()
+        return copy
+    
+    def _scan(self, chunk: str, final: bool) -> None:
+        """Walk the buffer once, dispatching each keyword hit to its rule."""
+        text = self._tail + chunk
+        base = self._base = self._offset
+        start = self._scanned_to - base
+        rule_end = [max(end - base, 0) for end in self._rule_end]
+        lowered = text.translate(_ASCII_LOWER)
+        # Keywords starting past limit may still be cut off by the chunk end
+        limit = len(text) if final else len(text) - _MAX_KEYWORD + 1
+        done = limit
+        
+        for hit in _KEYWORD_PATTERN.finditer(lowered, max(start - _MAX_KEYWORD + 1, 0)):
+            pos = hit.start()
+            if pos >= limit:
+                break
+            if pos >= start and not self._dispatch(text, lowered, pos, rule_end, final):
+                done = pos
+                break
+            offsets, probes = _OVERLAPS[hit.group()]
+            if probes and lowered.startswith(probes, pos):
+                for offset in offsets:
+                    at = pos + offset
+                    if at < start or not _KEYWORD_PATTERN.match(lowered, at):
+                        continue
+                    if at >= limit or not self._dispatch(text, lowered, at, rule_end, final):
+                        done = min(at, limit)
+                        break
+                else:
+                    continue
+                break
+        
+        done = max(done, start)
+        self._scanned_to = base + done
+        self._rule_end = [end + base for end in rule_end]
+        
+        # Keep enough before done to rediscover overlapping keywords and the
+        # status digits (plus whitespace) that precede a later phrase
+        keep = done
+        while keep > 0 and text[keep - 1].isspace():
+            keep -= 1
+        keep = max(min(keep - 3, done - _MAX_KEYWORD + 1), 0)
+        self._tail = text[keep:]
+        self._offset = base + keep
+    
+    def _dispatch(self, text: str, lowered: str, pos: int, rule_end: List[int],
+                  final: bool = True) -> bool:
+        """Apply the rule for the hit at pos; False if it cannot be settled yet."""
+        index = _RULE_BY_PREFIX[lowered[pos:pos + 3]]
+        if pos < rule_end[index]:
+            return True  # Inside the previous match of the same rule
+        
+        kind = _FACT_RULES[index][0]
+        collect = self._on_fact is not None
+        if kind in ("error", "next_steps"):
+            if index in self._first_match and not collect:
+                return True
+            if index == _STATUS_RULE:
+                pos = self._status_start(text, pos)
+                if pos < 0:
+                    return True
+        elif (kind == "decision" and len(self._decisions[index]) >= _MAX_DECISIONS
+              and not collect):
+            return True
+        
+        if not final and not self._settled(text, lowered, pos, index):
+            return False
+        
+        match = _RULE_PATTERNS[index].match(text, pos)
+        if not match:
+            return True
+        rule_end[index] = match.end()
+        
+        if kind in ("error", "next_steps"):
+            fact = match.group(0).strip()
+            self._first_match.setdefault(index, fact)
+        elif kind == "file":
+            fact = normalize_path(match.group(1))
+            self._add_file(fact, _FACT_RULES[index][3])
+        else:
+            fact = match.group(1).strip()
+            if len(self._decisions[index]) < _MAX_DECISIONS:
+                self._decisions[index].append(fact)
+        if collect:
+            self._on_fact(self._base + pos, kind, fact, _FACT_RULES[index][3])
+        return True
+    
+    @staticmethod
+    def _settled(text: str, lowered: str, pos: int, index: int) -> bool:
+        """Whether the rule's match at pos is independent of later input."""
+        boundaries = _RULE_BOUNDARIES[index]
+        if boundaries is None:
+            return True
+        run, terminator = boundaries
+        keyword_end = _KEYWORD_PATTERN.match(lowered, pos).end()
+        body = run.match(text, keyword_end).end()
+        if body == len(text):
+            return False
+        if body == keyword_end:
+            return True  # No separator: the match fails whatever follows
+        return terminator.search(text, body) is not None
+    
+    @staticmethod
+    def _status_start(text: str, pos: int) -> int:
+        """Start of the three digits + whitespace preceding a status phrase, or -1."""
+        start = pos
+        while start > 0 and text[start - 1].isspace():
+            start -= 1
+        if start == pos or start < 3 or not text[start - 3:start].isdecimal():
+            return -1
+        return start - 3
+    
+    def _add_file(self, key: str, operation: str) -> None:
+        for op in FILE_OPERATIONS:
+            if key in self._files[op]:
+                if FILE_OPERATIONS.index(op) > FILE_OPERATIONS.index(operation):
+                    del self._files[op][key]
+                    self._files[operation][key] = None
+                return
+        self._files[operation][key] = None
+    
+    def facts(self) -> Dict[str, str]:
+        """First match of the highest-priority rule for each fact kind."""
+        facts = {}
+        for index, (kind, _, _, _) in enumerate(_FACT_RULES):
+            key = "original_error" if kind == "error" else kind
+            if kind in ("error", "next_steps") and key not in facts and index in self._first_match:
+                facts[key] = self._first_match[index]
+        return facts
+    
+    def files(self) -> List[Dict[str, str]]:
+        """File operations by normalized path (modified > created > read)."""
+        return [
+            {"path": path, "operation": op}
+            for op in FILE_OPERATIONS
+            for path in self._files[op]
+        ]
+    
+    def decisions(self) -> List[Dict[str, str]]:
+        """Decision points in rule order, limited to 5."""
+        decisions = [
+            {"decision": decision, "context": _FACT_RULES[index][3]}
+            for index, items in self._decisions.items()
+            for decision in items
+        ]
+        return decisions[:_MAX_DECISIONS]
+
+
 class ProbeGenerator:
     """Generate probes from conversation history."""
     
     def __init__(self, conversation_history: str):
         self.history = conversation_history
-        self.extracted_facts = self._extract_facts()
-        self.extracted_files = self._extract_files()
-        self.extracted_decisions = self._extract_decisions()
+        extractor = FactExtractor()
+        extractor.scan(conversation_history)
+        self.extracted_facts = extractor.facts()
+        self.extracted_files = extractor.files()
+        self.extracted_decisions = extractor.decisions()
     
     def generate_probes(self) -> List[Probe]:
         """Generate all probe types for evaluation."""
@@ -191,89 +642,519 @@ class ProbeGenerator:
             ))
         
         return probes
+
+
+class IncrementalProbeGenerator(ProbeGenerator):
+    """Generate probes from a transcript that arrives in chunks.
     
-    def _extract_facts(self) -> Dict[str, str]:
-        """Extract factual claims from history."""
-        facts = {}
-        
-        # Extract error patterns
-        error_patterns = [
-            r"error[:\s]+(.+?)(?:\n|$)",
-            r"(\d{3})\s+(Unauthorized|Not Found|Internal Server Error)",
-            r"exception[:\s]+(.+?)(?:\n|$)"
-        ]
-        
-        for pattern in error_patterns:
-            match = re.search(pattern, self.history, re.IGNORECASE)
-            if match:
-                facts["original_error"] = match.group(0).strip()
+    Extraction state is kept between chunks, so probes can be regenerated
+    at any point of a long-running session without rescanning the history.
+    """
+    
+    def __init__(self):
+        self.history = None  # Not retained; see chars_consumed
+        self.chars_consumed = 0
+        self._extractor = FactExtractor()
+        self.extracted_facts = {}
+        self.extracted_files = []
+        self.extracted_decisions = []
+    
+    def feed(self, chunk: str) -> None:
+        """Consume the next piece of the transcript."""
+        self._extractor.feed(chunk)
+        self.chars_consumed += len(chunk)
+    
+    def feed_file(self, handle, chunk_size: int = 1 << 16) -> None:
+        """Consume a text file handle until EOF."""
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
                 break
+            self.feed(chunk)
+    
+    def feed_jsonl(self, lines) -> None:
+        """Consume session log lines, one JSON message per line.
         
-        # Extract next steps
-        next_step_patterns = [
-            r"next[:\s]+(.+?)(?:\n|$)",
-            r"TODO[:\s]+(.+?)(?:\n|$)",
-            r"remaining[:\s]+(.+?)(?:\n|$)"
+        Each message contributes its "content", either a string or a list
+        of blocks with "text" fields; blank and malformed lines are skipped.
+        """
+        for line in lines:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            content = message.get("content")
+            if isinstance(content, list):
+                content = "\n".join(
+                    block.get("text", "") for block in content
+                    if isinstance(block, dict)
+                )
+            if isinstance(content, str) and content:
+                self.feed(content + "\n")
+    
+    def refresh(self) -> None:
+        """Update extracted facts, treating the held-back tail as final."""
+        snapshot = self._extractor.snapshot()
+        self.extracted_facts = snapshot.facts()
+        self.extracted_files = snapshot.files()
+        self.extracted_decisions = snapshot.decisions()
+    
+    def generate_probes(self) -> List[Probe]:
+        """Generate probes for everything consumed so far."""
+        self.refresh()
+        return super().generate_probes()
+
+
+class JudgeBackend:
+    """
+    Scores a probe response against rubric criteria.
+    
+    Backends receive one criterion per call, or every criterion for the
+    probe at once when supports_packing is set and the evaluator packs
+    requests. Results must come back in the order of the criteria.
+    """
+    
+    supports_packing = False
+    
+    async def score(self,
+                    criteria: List[Dict],
+                    probe: Probe,
+                    response: str,
+                    context: str) -> List[CriterionResult]:
+        raise NotImplementedError
+    
+    def identity(self) -> str:
+        """Backend class and model; part of the judge cache key."""
+        model = getattr(self, "model", None)
+        name = type(self).__name__
+        return f"{name}:{model}" if model else name
+    
+    def cacheable(self, result: CriterionResult) -> bool:
+        """Whether a result is a judge verdict worth caching."""
+        return True
+    
+    async def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class HeuristicJudge(JudgeBackend):
+    """
+    Heuristic scoring for demonstration.
+    
+    Production systems should use an LLM judge backend instead.
+    """
+    
+    supports_packing = True
+    
+    async def score(self,
+                    criteria: List[Dict],
+                    probe: Probe,
+                    response: str,
+                    context: str) -> List[CriterionResult]:
+        return [
+            CriterionResult(
+                criterion_id=criterion["id"],
+                score=heuristic_score(criterion, response, probe.ground_truth),
+                reasoning=_heuristic_reasoning(criterion["id"])
+            )
+            for criterion in criteria
         ]
-        
-        for pattern in next_step_patterns:
-            match = re.search(pattern, self.history, re.IGNORECASE)
-            if match:
-                facts["next_steps"] = match.group(0).strip()
-                break
-        
-        return facts
+
+
+_HEURISTIC_REASONING: Dict[str, str] = {}
+
+
+def _heuristic_reasoning(criterion_id: str) -> str:
+    """Shared reasoning string per criterion (identical for every result)."""
+    reasoning = _HEURISTIC_REASONING.get(criterion_id)
+    if reasoning is None:
+        reasoning = f"Evaluated {criterion_id} based on response content."
+        _HEURISTIC_REASONING[criterion_id] = reasoning
+    return reasoning
+
+
+def heuristic_score(criterion: Dict,
+                    response: str,
+                    ground_truth: Optional[str]) -> float:
+    """Score a response from its length and content (0-5)."""
+    score = 3.0  # Base score
+    
+    # Adjust based on response length and content
+    if len(response) < 50:
+        score -= 1.0  # Too short
+    elif len(response) > 500:
+        score += 0.5  # Detailed
+    
+    # Check for technical content
+    if any(ext in response for ext in [".ts", ".py", ".js", ".md"]):
+        score += 0.5  # Contains file references
+    
+    if ground_truth and ground_truth in response:
+        score += 1.0  # Contains ground truth
+    
+    return min(5.0, max(0.0, score))
+
+
+class ScoreHistogram:
+    """
+    Running mean and percentiles of 0-5 scores in constant memory.
+    
+    Scores are counted in fixed 0.01-wide bins, so percentiles are exact
+    to two decimals however many scores are added.
+    """
+    
+    RESOLUTION = 100  # Bins per point
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.bins = [0] * (5 * self.RESOLUTION + 1)
+    
+    def add(self, score: float) -> None:
+        self.count += 1
+        self.total += score
+        self.bins[min(max(round(score * self.RESOLUTION), 0), len(self.bins) - 1)] += 1
+    
+    def merge(self, other: "ScoreHistogram") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.bins = [a + b for a, b in zip(self.bins, other.bins)]
     
-    def _extract_files(self) -> List[Dict[str, str]]:
-        """Extract file operations from history."""
-        files = []
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile (q in 0-100)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, -(-q * self.count // 100))
+        seen = 0
+        for index, n in enumerate(self.bins):
+            seen += n
+            if seen >= rank:
+                return index / self.RESOLUTION
+        return 5.0
+
+
+class SummaryStats:
+    """Online aggregate and per-dimension statistics of evaluation results."""
+    
+    PERCENTILES = (10, 50, 90)
+    
+    def __init__(self):
+        self.aggregate = ScoreHistogram()
+        self.dimensions: Dict[str, ScoreHistogram] = {}
+    
+    def add(self, aggregate_score: float, dimension_scores: Dict[str, float]) -> None:
+        self.aggregate.add(aggregate_score)
+        for dim, score in dimension_scores.items():
+            if dim not in self.dimensions:
+                self.dimensions[dim] = ScoreHistogram()
+            self.dimensions[dim].add(score)
+    
+    def merge(self, other: "SummaryStats") -> None:
+        self.aggregate.merge(other.aggregate)
+        for dim, histogram in other.dimensions.items():
+            self.dimensions.setdefault(dim, ScoreHistogram()).merge(histogram)
+    
+    def summary(self) -> Dict:
+        """Summary in the shape of CompressionEvaluator.get_summary."""
+        if not self.aggregate.count:
+            return {"error": "No evaluations performed"}
         
-        # Common file patterns
-        file_patterns = [
-            r"(?:modified|changed|updated|edited)\s+([^\s]+\.[a-z]+)",
-            r"(?:created|added)\s+([^\s]+\.[a-z]+)",
-            r"(?:read|examined|opened)\s+([^\s]+\.[a-z]+)"
-        ]
+        avg_dimensions = {dim: h.mean for dim, h in self.dimensions.items()}
+        return {
+            "total_evaluations": self.aggregate.count,
+            "average_score": self.aggregate.mean,
+            "dimension_averages": avg_dimensions,
+            "weakest_dimension": min(avg_dimensions, key=avg_dimensions.get),
+            "strongest_dimension": max(avg_dimensions, key=avg_dimensions.get),
+            "score_percentiles": {
+                f"p{q}": self.aggregate.percentile(q) for q in self.PERCENTILES
+            },
+            "dimension_percentiles": {
+                dim: {f"p{q}": h.percentile(q) for q in self.PERCENTILES}
+                for dim, h in self.dimensions.items()
+            }
+        }
+
+
+class ResultColumns:
+    """
+    Evaluation results stored column-wise for analysis.
+    
+    One float column per aggregate, dimension and criterion score (NaN
+    where absent) plus probe type and an optional label column, about
+    200 bytes per result. Export with to_numpy() (structured array),
+    to_arrow() or write_parquet(); NumPy and pyarrow are optional.
+    """
+    
+    def __init__(self, rubric: CompiledRubric = DEFAULT_RUBRIC):
+        self.rubric = rubric
+        self.probe_types: List[str] = []
+        self.labels: List[Optional[str]] = []
+        self.aggregate = array("d")
+        self.dimensions = {dim: array("d") for dim in rubric.dimensions}
+        self.criteria = {cid: array("d") for cid in rubric.criterion_ids}
+    
+    def __len__(self) -> int:
+        return len(self.aggregate)
+    
+    def append(self, result: EvaluationResult, label: Optional[str] = None) -> None:
+        nan = float("nan")
+        self.probe_types.append(result.probe.probe_type.value)
+        self.labels.append(label)
+        self.aggregate.append(result.aggregate_score)
+        for dim, column in self.dimensions.items():
+            column.append(result.dimension_scores.get(dim, nan))
+        scores = {r.criterion_id: r.score for r in result.criterion_results}
+        for cid, column in self.criteria.items():
+            column.append(scores.get(cid, nan))
+    
+    def extend(self, results: List[EvaluationResult]) -> "ResultColumns":
+        for result in results:
+            self.append(result)
+        return self
+    
+    def to_dict(self) -> Dict[str, list]:
+        """Column name -> values (dimension and criterion columns prefixed)."""
+        columns = {
+            "probe_type": self.probe_types,
+            "label": self.labels,
+            "aggregate_score": self.aggregate.tolist()
+        }
+        columns.update({f"dim_{d}": c.tolist() for d, c in self.dimensions.items()})
+        columns.update({f"crit_{cid}": c.tolist() for cid, c in self.criteria.items()})
+        return columns
+    
+    def to_numpy(self):
+        """NumPy structured array, one record per result."""
+        if np is None:
+            raise ImportError("to_numpy requires numpy")
+        label_width = max((len(l) for l in self.labels if l), default=1)
+        floats = [("aggregate_score", self.aggregate)]
+        floats += [(f"dim_{d}", c) for d, c in self.dimensions.items()]
+        floats += [(f"crit_{cid}", c) for cid, c in self.criteria.items()]
+        records = np.empty(len(self), dtype=[
+            ("probe_type", "U12"), ("label", f"U{label_width}")
+        ] + [(name, "f8") for name, _ in floats])
+        records["probe_type"] = self.probe_types
+        records["label"] = [l or "" for l in self.labels]
+        for name, column in floats:
+            records[name] = np.frombuffer(column, dtype="f8") if len(column) else []
+        return records
+    
+    def to_arrow(self):
+        """pyarrow Table (probe type dictionary-encoded)."""
+        import pyarrow as pa
         
-        for pattern in file_patterns:
-            matches = re.findall(pattern, self.history, re.IGNORECASE)
-            for match in matches:
-                if match not in [f["path"] for f in files]:
-                    files.append({
-                        "path": match,
-                        "operation": "modified" if "modif" in pattern else "created" if "creat" in pattern else "read"
-                    })
-        
-        return files
-    
-    def _extract_decisions(self) -> List[Dict[str, str]]:
-        """Extract decision points from history."""
-        decisions = []
-        
-        decision_patterns = [
-            r"decided to\s+(.+?)(?:\n|$)",
-            r"chose\s+(.+?)(?:\n|$)",
-            r"going with\s+(.+?)(?:\n|$)",
-            r"will use\s+(.+?)(?:\n|$)"
-        ]
+        columns = self.to_dict()
+        table = {name: pa.array(values, type=pa.float64())
+                 for name, values in columns.items() if name not in ("probe_type", "label")}
+        table["probe_type"] = pa.array(self.probe_types).dictionary_encode()
+        table["label"] = pa.array(self.labels, type=pa.string())
+        return pa.table(table)
+    
+    def write_parquet(self, path: str) -> None:
+        import pyarrow.parquet as pq
         
-        for pattern in decision_patterns:
-            matches = re.findall(pattern, self.history, re.IGNORECASE)
-            for match in matches:
-                decisions.append({
-                    "decision": match.strip(),
-                    "context": pattern.split("\\s+")[0]
-                })
+        pq.write_table(self.to_arrow(), path)
+
+
+class PositionalProbeGenerator:
+    """
+    Probes sampled across the session timeline.
+    
+    Every fact occurrence (errors, file operations, decisions, next steps)
+    is assigned to the beginning, middle or end third of the history by
+    position. Each bucket keeps a seeded reservoir sample of occurrences,
+    near-duplicate facts are dropped (character 3-gram Jaccard), and up to
+    probes_per_bucket probes are generated per bucket. Questions quote the
+    preceding line as an anchor; context_reference is "bucket@offset", so
+    bucket_scores() can compare recall across positions ("lost in the
+    middle").
+    """
+    
+    BUCKETS = ("beginning", "middle", "end")
+    
+    _PHRASES = {"beginning": "Early in the session", "middle": "Midway through the session",
+                "end": "Late in the session"}
+    
+    def __init__(self,
+                 conversation_history: str,
+                 probes_per_bucket: int = 3,
+                 similarity_threshold: float = 0.7,
+                 oversample: int = 4,
+                 seed: int = 0):
+        self.history = conversation_history
+        self.probes_per_bucket = probes_per_bucket
+        self.similarity_threshold = similarity_threshold
+        self._rng = random.Random(seed)
+        self._capacity = probes_per_bucket * oversample
+        self._reservoirs = {bucket: [] for bucket in self.BUCKETS}
+        self._seen = {bucket: 0 for bucket in self.BUCKETS}
         
-        return decisions[:5]  # Limit to 5 decisions
+        FactExtractor(on_fact=self._sample).scan(conversation_history)
+    
+    def _bucket(self, position: int) -> str:
+        third = max(len(self.history), 1) / len(self.BUCKETS)
+        return self.BUCKETS[min(int(position / third), len(self.BUCKETS) - 1)]
+    
+    def _sample(self, position: int, kind: str, fact: str, label: Optional[str]) -> None:
+        """Reservoir sampling (Algorithm R) per bucket."""
+        bucket = self._bucket(position)
+        self._seen[bucket] += 1
+        reservoir = self._reservoirs[bucket]
+        item = (position, kind, fact, label)
+        if len(reservoir) < self._capacity:
+            reservoir.append(item)
+        else:
+            slot = self._rng.randrange(self._seen[bucket])
+            if slot < self._capacity:
+                reservoir[slot] = item
+    
+    def _anchor(self, position: int) -> str:
+        """The last non-empty line before position, shortened."""
+        end = self.history.rfind("\n", 0, position)
+        while end > 0:
+            start = self.history.rfind("\n", 0, end) + 1
+            line = self.history[start:end].strip()
+            if line:
+                return line if len(line) <= 80 else line[:77] + "..."
+            end = start - 1
+        return ""
+    
+    def _question(self, bucket: str, kind: str, label: Optional[str], anchor: str) -> str:
+        when = self._PHRASES[bucket]
+        if anchor:
+            when += f', right after "{anchor}"'
+        if kind == "error":
+            return f"{when}, what error or issue came up?"
+        if kind == "next_steps":
+            return f"{when}, what was the planned next step?"
+        if kind == "file":
+            verb = {"modified": "modify", "created": "create", "read": "read"}[label]
+            return f"{when}, which file did we {verb}?"
+        return f"{when}, what did we decide?"
+    
+    def generate_probes(self) -> List[Probe]:
+        """Up to probes_per_bucket distinct-fact probes per bucket, in timeline order."""
+        probe_types = {"error": ProbeType.RECALL, "file": ProbeType.ARTIFACT,
+                       "next_steps": ProbeType.CONTINUATION, "decision": ProbeType.DECISION}
+        probes = []
+        for bucket in self.BUCKETS:
+            kept, signatures = [], []
+            for item in sorted(self._reservoirs[bucket]):
+                position, kind, fact, label = item
+                grams = _trigrams(fact.lower())
+                if any(_jaccard(grams, other) >= self.similarity_threshold for other in signatures):
+                    continue
+                signatures.append(grams)
+                kept.append(item)
+            # Spread the picks over the bucket rather than taking its start
+            if len(kept) > self.probes_per_bucket:
+                step = len(kept) / self.probes_per_bucket
+                kept = [kept[int(i * step)] for i in range(self.probes_per_bucket)]
+            for position, kind, fact, label in kept:
+                probes.append(Probe(
+                    probe_type=probe_types[kind],
+                    question=self._question(bucket, kind, label, self._anchor(position)),
+                    ground_truth=fact,
+                    context_reference=f"{bucket}@{position}"
+                ))
+        return probes
+    
+    def bucket_counts(self) -> Dict[str, int]:
+        """Fact occurrences seen per bucket."""
+        return dict(self._seen)
+
+
+def _trigrams(text: str) -> set:
+    text = " ".join(text.split())
+    return {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def bucket_scores(results: List["EvaluationResult"]) -> Dict[str, float]:
+    """Average aggregate score per timeline bucket of positional probes."""
+    totals, counts = {}, {}
+    for result in results:
+        reference = result.probe.context_reference or ""
+        if "@" not in reference:
+            continue
+        bucket = reference.split("@", 1)[0]
+        totals[bucket] = totals.get(bucket, 0.0) + result.aggregate_score
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return {bucket: totals[bucket] / counts[bucket] for bucket in totals}
+
+
+def _run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    asyncio.run cannot be called while an event loop is running in this
+    thread (notebooks, async frameworks), so in that case the coroutine
+    gets its own loop on a worker thread and this call blocks until done.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="evaluate") as executor:
+        return executor.submit(asyncio.run, coro).result()
 
 
 class CompressionEvaluator:
     """Evaluate compression quality using probes and LLM judge."""
     
-    def __init__(self, model: str = "gpt-5.2"):
+    def __init__(self,
+                 model: str = "gpt-5.2",
+                 judge: Optional[JudgeBackend] = None,
+                 max_concurrency: int = 8,
+                 pack_criteria: bool = False,
+                 cache=None,
+                 rubric: Optional[CompiledRubric] = None,
+                 keep_results: bool = True,
+                 tokenizer=None,
+                 collect_columns: bool = False):
+        """
+        Args:
+            model: Judge model name
+            judge: Judge backend (defaults to HeuristicJudge)
+            max_concurrency: Maximum judge calls in flight at once
+            pack_criteria: Send all criteria for a probe in one judge call
+                when the backend supports it
+            cache: Optional JudgeCache (judge_cache.py); criteria already judged
+                by this model and judge backend for the same probe, response
+                and context are served from it
+            rubric: Compiled rubric for dimension scores (defaults to
+                RUBRIC_CRITERIA)
+            keep_results: Keep every EvaluationResult in self.results;
+                when False only the running statistics behind get_summary
+                are kept, so memory stays constant over long runs
+            tokenizer: Tokenizer for record_compression (defaults to
+                token_accounting.get_tokenizer())
+            collect_columns: Also append every result to self.columns
+                (ResultColumns) for compact columnar export
+        """
         self.model = model
+        self.judge = judge or HeuristicJudge()
+        self.max_concurrency = max_concurrency
+        self.pack_criteria = pack_criteria
+        self.cache = cache
+        self.rubric = rubric or DEFAULT_RUBRIC
+        self.keep_results = keep_results
         self.results: List[EvaluationResult] = []
+        self.stats = SummaryStats()
+        self.columns = ResultColumns(self.rubric) if collect_columns else None
+        self._tokenizer = tokenizer
+        self._tokens: Optional[TokenAccounting] = None
     
     def evaluate(self, 
                  probe: Probe, 
@@ -282,6 +1163,10 @@ class CompressionEvaluator:
         """
         Evaluate a single probe response.
         
+        Blocking wrapper around evaluate_async; use that from async code.
+        Also works when called inside a running event loop (the evaluation
+        then runs on a worker thread).
+        
         Args:
             probe: The probe question
             response: The model's response to evaluate
@@ -290,19 +1175,75 @@ class CompressionEvaluator:
         Returns:
             EvaluationResult with scores and reasoning
         """
+        return _run_sync(self.evaluate_async(probe, response, compressed_context))
+    
+    def evaluate_many(self, items: List[tuple]) -> List[EvaluationResult]:
+        """Evaluate (probe, response, compressed_context) items concurrently."""
+        return _run_sync(self.evaluate_many_async(items))
+    
+    async def evaluate_many_async(self, items: List[tuple]) -> List[EvaluationResult]:
+        """
+        Evaluate many probe responses, sharing one concurrency limit.
+        
+        Results are returned (and recorded) in the order of items.
+        """
+        limit = asyncio.Semaphore(self.max_concurrency)
+        return list(await asyncio.gather(*(
+            self.evaluate_async(probe, response, context, _limit=limit)
+            for probe, response, context in items
+        )))
+    
+    async def evaluate_async(self,
+                             probe: Probe,
+                             response: str,
+                             compressed_context: str,
+                             _limit: Optional[asyncio.Semaphore] = None) -> EvaluationResult:
+        """
+        Evaluate a single probe response, fanning criteria out to the judge.
+        
+        With pack_criteria (and a backend that supports it) all criteria go
+        in one judge call; otherwise one call per criterion, at most
+        max_concurrency in flight.
+        """
+        limit = _limit or asyncio.Semaphore(self.max_concurrency)
+        
         # Get relevant criteria based on probe type
         criteria = self._get_criteria_for_probe(probe.probe_type)
         
-        # Evaluate each criterion
-        criterion_results = []
-        for criterion in criteria:
-            result = self._evaluate_criterion(
-                criterion, 
-                probe, 
-                response, 
-                compressed_context
-            )
-            criterion_results.append(result)
+        # Serve previously judged criteria from the cache
+        cached, keys = {}, {}
+        if self.cache is not None:
+            keys = self._cache_keys(criteria, probe, response, compressed_context)
+            hits = self.cache.get_many(keys.values())
+            cached = {
+                cid: CriterionResult(criterion_id=cid, score=hits[key][0], reasoning=hits[key][1])
+                for cid, key in keys.items() if key in hits
+            }
+        pending = [c for c in criteria if c["id"] not in cached]
+        
+        # Evaluate remaining criteria concurrently
+        if self.pack_criteria and self.judge.supports_packing:
+            batches = [pending] if pending else []
+        else:
+            batches = [[criterion] for criterion in pending]
+        
+        async def judge(batch: List[Dict]) -> List[CriterionResult]:
+            async with limit:
+                return await self.judge.score(batch, probe, response, compressed_context)
+        
+        judged = {
+            result.criterion_id: result
+            for results in await asyncio.gather(*(judge(batch) for batch in batches))
+            for result in results
+        }
+        if self.cache is not None and judged:
+            self.cache.put_many({
+                keys[cid]: (result.score, result.reasoning)
+                for cid, result in judged.items() if self.judge.cacheable(result)
+            })
+        criterion_results = tuple(
+            cached.get(c["id"]) or judged[c["id"]] for c in criteria
+        )
         
         # Calculate dimension scores
         dimension_scores = self._calculate_dimension_scores(criterion_results)
@@ -318,9 +1259,28 @@ class CompressionEvaluator:
             dimension_scores=dimension_scores
         )
         
-        self.results.append(result)
+        self.stats.add(aggregate_score, dimension_scores)
+        if self.columns is not None:
+            self.columns.append(result)
+        if self.keep_results:
+            self.results.append(result)
         return result
     
+    def _cache_keys(self,
+                    criteria: List[Dict],
+                    probe: Probe,
+                    response: str,
+                    context: str) -> Dict[str, str]:
+        """Cache key per criterion id for this model, judge backend and inputs."""
+        model = f"{self.model}|{self.judge.identity()}"
+        probe_digest = content_digest(probe.probe_type.value, probe.question, probe.ground_truth)
+        response_digest = content_digest(response)
+        context_digest = content_digest(context)
+        return {
+            c["id"]: self.cache.key(model, c["id"], probe_digest, response_digest, context_digest)
+            for c in criteria
+        }
+    
     def _get_criteria_for_probe(self, probe_type: ProbeType) -> List[Dict]:
         """Get relevant criteria for probe type."""
         criteria = []
@@ -344,122 +1304,41 @@ class CompressionEvaluator:
         
         return criteria
     
-    def _evaluate_criterion(self,
-                           criterion: Dict,
-                           probe: Probe,
-                           response: str,
-                           context: str) -> CriterionResult:
-        """
-        Evaluate a single criterion using LLM judge.
-        
-        PRODUCTION NOTE: This is a stub implementation.
-        Production systems should call the actual LLM API:
-        
-        ```python
-        result = openai.chat.completions.create(
-            model="gpt-5.2",
-            messages=[
-                {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
-                {"role": "user", "content": self._format_judge_input(criterion, probe, response, context)}
-            ]
-        )
-        return self._parse_judge_output(result)
-        ```
-        """
-        # Stub implementation - in production, call LLM judge
-        score = self._heuristic_score(criterion, response, probe.ground_truth)
-        reasoning = f"Evaluated {criterion['id']} based on response content."
-        
-        return CriterionResult(
-            criterion_id=criterion["id"],
-            score=score,
-            reasoning=reasoning
-        )
-    
-    def _heuristic_score(self, 
-                         criterion: Dict, 
-                         response: str, 
-                         ground_truth: Optional[str]) -> float:
-        """
-        Heuristic scoring for demonstration.
-        
-        Production systems should use LLM judge instead.
-        """
-        score = 3.0  # Base score
-        
-        # Adjust based on response length and content
-        if len(response) < 50:
-            score -= 1.0  # Too short
-        elif len(response) > 500:
-            score += 0.5  # Detailed
-        
-        # Check for technical content
-        if any(ext in response for ext in [".ts", ".py", ".js", ".md"]):
-            score += 0.5  # Contains file references
-        
-        if ground_truth and ground_truth in response:
-            score += 1.0  # Contains ground truth
-        
-        return min(5.0, max(0.0, score))
-    
     def _calculate_dimension_scores(self, 
                                     criterion_results: List[CriterionResult]) -> Dict[str, float]:
         """Calculate dimension scores from criterion results."""
-        dimension_scores = {}
-        
-        for dimension, criteria in RUBRIC_CRITERIA.items():
-            criterion_ids = [c["id"] for c in criteria]
-            relevant_results = [
-                r for r in criterion_results 
-                if r.criterion_id in criterion_ids
-            ]
-            
-            if relevant_results:
-                # Weighted average
-                total_weight = sum(
-                    c["weight"] for c in criteria 
-                    if c["id"] in [r.criterion_id for r in relevant_results]
-                )
-                weighted_sum = sum(
-                    r.score * next(c["weight"] for c in criteria if c["id"] == r.criterion_id)
-                    for r in relevant_results
-                )
-                dimension_scores[dimension] = weighted_sum / total_weight if total_weight > 0 else 0.0
-        
-        return dimension_scores
+        return self.rubric.dimension_scores(criterion_results)
+    
+    @property
+    def tokens(self) -> TokenAccounting:
+        """Token accounting, created (and the tokenizer loaded) on first use."""
+        if self._tokens is None:
+            self._tokens = TokenAccounting(self._tokenizer)
+        return self._tokens
+    
+    def record_compression(self, original_history: str, compressed_context: str) -> Dict:
+        """Count tokens of a compressed session for the summary."""
+        return self.tokens.record(original_history, compressed_context)
     
     def get_summary(self) -> Dict:
         """Get summary of all evaluation results."""
-        if not self.results:
-            return {"error": "No evaluations performed"}
-        
-        avg_score = sum(r.aggregate_score for r in self.results) / len(self.results)
-        
-        # Average dimension scores
-        dimension_totals = {}
-        dimension_counts = {}
-        
-        for result in self.results:
-            for dim, score in result.dimension_scores.items():
-                dimension_totals[dim] = dimension_totals.get(dim, 0) + score
-                dimension_counts[dim] = dimension_counts.get(dim, 0) + 1
-        
-        avg_dimensions = {
-            dim: dimension_totals[dim] / dimension_counts[dim]
-            for dim in dimension_totals
-        }
-        
-        return {
-            "total_evaluations": len(self.results),
-            "average_score": avg_score,
-            "dimension_averages": avg_dimensions,
-            "weakest_dimension": min(avg_dimensions, key=avg_dimensions.get),
-            "strongest_dimension": max(avg_dimensions, key=avg_dimensions.get)
-        }
+        summary = self.stats.summary()
+        if self._tokens is not None and self._tokens.sessions:
+            summary["tokens"] = self._tokens.summary(summary.get("average_score"))
+        return summary
 
 
 class StructuredSummarizer:
-    """Generate structured summaries with explicit sections."""
+    """
+    Generate structured summaries with explicit sections.
+    
+    Memory is bounded: decisions and next steps are ring buffers of the
+    latest max_items entries and each file section keeps at most
+    max_files paths. Only sections changed by a span are re-rendered.
+    With a token_budget, items are evicted oldest first from the sections
+    in EVICTION_ORDER until the summary fits; intent and current state
+    are never evicted.
+    """
     
     TEMPLATE = """## Session Intent
 {intent}
@@ -480,15 +1359,44 @@ class StructuredSummarizer:
 {next_steps}
 """
     
-    def __init__(self):
+    # Lowest priority first
+    EVICTION_ORDER = ("files_read", "decisions", "files_modified", "next_steps")
+    
+    def __init__(self,
+                 max_items: int = 5,
+                 max_files: int = 200,
+                 token_budget: Optional[int] = None,
+                 tokenizer=None):
+        """
+        Args:
+            max_items: Decisions and next steps kept (latest win)
+            max_files: Paths kept per file section (oldest evicted)
+            token_budget: Maximum summary size in tokens, if any
+            tokenizer: Token counter for the budget (defaults to
+                token_accounting.get_tokenizer())
+        """
+        self.max_files = max_files
+        self.token_budget = token_budget
+        # File sections are ordered dicts keyed on normalized path:
+        # files_modified maps path -> change, files_read maps path -> None
         self.sections = {
             "intent": "",
-            "files_modified": [],
-            "files_read": [],
-            "decisions": [],
+            "files_modified": {},
+            "files_read": {},
+            "decisions": deque(maxlen=max_items),
             "current_state": "",
-            "next_steps": []
+            "next_steps": deque(maxlen=max_items)
         }
+        self._rendered: Dict[str, str] = {}
+        self._section_tokens: Dict[str, int] = {}
+        self._dirty = set(self.sections)
+        self._tokenizer = None
+        self._template_tokens = 0
+        if token_budget is not None:
+            self._tokenizer = tokenizer or get_tokenizer()
+            self._template_tokens = self._tokenizer.count(
+                self.TEMPLATE.format(**{name: "" for name in self.sections})
+            )
     
     def update_from_span(self, new_content: str) -> str:
         """
@@ -512,8 +1420,8 @@ class StructuredSummarizer:
         """Extract structured information from content."""
         extracted = {
             "intent": "",
-            "files_modified": [],
-            "files_read": [],
+            "files_modified": {},
+            "files_read": {},
             "decisions": [],
             "current_state": "",
             "next_steps": []
@@ -522,17 +1430,16 @@ class StructuredSummarizer:
         # Extract file modifications
         mod_pattern = r"(?:modified|changed|updated|fixed)\s+([^\s]+\.[a-z]+)[:\s]*(.+?)(?:\n|$)"
         for match in re.finditer(mod_pattern, content, re.IGNORECASE):
-            extracted["files_modified"].append({
-                "path": match.group(1),
-                "change": match.group(2).strip()[:100]
-            })
+            extracted["files_modified"].setdefault(
+                normalize_path(match.group(1)), match.group(2).strip()[:100]
+            )
         
         # Extract file reads
         read_pattern = r"(?:read|examined|opened|checked)\s+([^\s]+\.[a-z]+)"
         for match in re.finditer(read_pattern, content, re.IGNORECASE):
-            file_path = match.group(1)
-            if file_path not in [f["path"] for f in extracted["files_modified"]]:
-                extracted["files_read"].append(file_path)
+            file_path = normalize_path(match.group(1))
+            if file_path not in extracted["files_modified"]:
+                extracted["files_read"][file_path] = None
         
         # Extract decisions
         decision_pattern = r"(?:decided|chose|going with|will use)\s+(.+?)(?:\n|$)"
@@ -542,59 +1449,179 @@ class StructuredSummarizer:
         return extracted
     
     def _merge_sections(self, new_info: Dict):
-        """Merge new information with existing sections."""
+        """Merge new information with existing sections, marking changes."""
         # Update intent if empty
         if new_info["intent"] and not self.sections["intent"]:
             self.sections["intent"] = new_info["intent"]
+            self._dirty.add("intent")
         
-        # Merge file lists (deduplicate by path)
-        existing_mod_paths = [f["path"] for f in self.sections["files_modified"]]
-        for file_info in new_info["files_modified"]:
-            if file_info["path"] not in existing_mod_paths:
-                self.sections["files_modified"].append(file_info)
+        # Merge file sections (first recorded change wins; a modification
+        # moves the path out of files_read)
+        modified = self.sections["files_modified"]
+        read = self.sections["files_read"]
+        for file_path, change in new_info["files_modified"].items():
+            if file_path not in modified:
+                modified[file_path] = change
+                self._dirty.add("files_modified")
+            if read.pop(file_path, False) is None:
+                self._dirty.add("files_read")
         
         # Merge read files
         for file_path in new_info["files_read"]:
-            if file_path not in self.sections["files_read"]:
-                self.sections["files_read"].append(file_path)
+            if file_path not in modified and file_path not in read:
+                read[file_path] = None
+                self._dirty.add("files_read")
         
-        # Append decisions
-        self.sections["decisions"].extend(new_info["decisions"])
+        for name in ("files_modified", "files_read"):
+            paths = self.sections[name]
+            while len(paths) > self.max_files:
+                del paths[next(iter(paths))]
+        
+        # Append decisions (ring buffer keeps the latest)
+        if new_info["decisions"]:
+            self.sections["decisions"].extend(new_info["decisions"])
+            self._dirty.add("decisions")
         
         # Update current state (latest wins)
         if new_info["current_state"]:
             self.sections["current_state"] = new_info["current_state"]
+            self._dirty.add("current_state")
         
         # Merge next steps
-        self.sections["next_steps"].extend(new_info["next_steps"])
+        if new_info["next_steps"]:
+            self.sections["next_steps"].extend(new_info["next_steps"])
+            self._dirty.add("next_steps")
+    
+    def _render_section(self, name: str) -> str:
+        value = self.sections[name]
+        if name == "intent":
+            return value or "Not specified"
+        if name == "current_state":
+            return value or "In progress"
+        if name == "files_modified":
+            lines = [f"- {path}: {change}" for path, change in value.items()]
+        elif name == "files_read":
+            lines = [f"- {path}" for path in value]
+        elif name == "decisions":
+            lines = [f"- {d}" for d in value]
+        else:
+            lines = [f"{i+1}. {s}" for i, s in enumerate(value)]
+        return "\n".join(lines) or "None"
+    
+    def _refresh(self) -> None:
+        """Re-render (and re-count) only the sections marked dirty."""
+        for name in self._dirty:
+            self._rendered[name] = self._render_section(name)
+            if self._tokenizer is not None:
+                self._section_tokens[name] = self._tokenizer.count(self._rendered[name])
+        self._dirty.clear()
+    
+    def token_count(self) -> int:
+        """Summary size in tokens, summed per section (needs a token_budget)."""
+        self._refresh()
+        return self._template_tokens + sum(self._section_tokens.values())
+    
+    def _enforce_budget(self) -> None:
+        """Evict the oldest lowest-priority items until within budget."""
+        while self.token_count() > self.token_budget:
+            for name in self.EVICTION_ORDER:
+                items = self.sections[name]
+                if items:
+                    if isinstance(items, deque):
+                        items.popleft()
+                    else:
+                        del items[next(iter(items))]
+                    self._dirty.add(name)
+                    break
+            else:
+                return  # Only intent and current state left
     
     def _format_summary(self) -> str:
         """Format sections into summary string."""
-        files_modified_str = "\n".join(
-            f"- {f['path']}: {f['change']}" 
-            for f in self.sections["files_modified"]
-        ) or "None"
-        
-        files_read_str = "\n".join(
-            f"- {f}" for f in self.sections["files_read"]
-        ) or "None"
-        
-        decisions_str = "\n".join(
-            f"- {d}" for d in self.sections["decisions"][-5:]  # Keep last 5
-        ) or "None"
-        
-        next_steps_str = "\n".join(
-            f"{i+1}. {s}" for i, s in enumerate(self.sections["next_steps"][-5:])
-        ) or "None"
-        
-        return self.TEMPLATE.format(
-            intent=self.sections["intent"] or "Not specified",
-            files_modified=files_modified_str,
-            files_read=files_read_str,
-            decisions=decisions_str,
-            current_state=self.sections["current_state"] or "In progress",
-            next_steps=next_steps_str
-        )
+        if self.token_budget is not None:
+            self._enforce_budget()
+        self._refresh()
+        return self.TEMPLATE.format(**self._rendered)
+
+
+class RateLimiter:
+    """Token bucket limiting calls to rate per second, with bursts of burst."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def run_probes_async(probes: List[Probe],
+                           compressed_context: str,
+                           model_response_fn,
+                           evaluator: "CompressionEvaluator",
+                           max_concurrency: int = 4,
+                           requests_per_second: Optional[float] = None,
+                           warm_prefix: bool = True) -> List[EvaluationResult]:
+    """
+    Collect probe responses concurrently, judging each as it arrives.
+    
+    model_response_fn(compressed_context, question) may be a plain function
+    (run on a thread pool) or a coroutine function. Every probe is asked
+    against the same compressed context; with warm_prefix the model answers
+    the first probe alone before fanning out, so providers with prompt
+    caching have the shared context cached for the rest (the first answer
+    is judged together with the others).
+    
+    Returns results in probe order.
+    """
+    limiter = RateLimiter(requests_per_second) if requests_per_second else None
+    slots = asyncio.Semaphore(max_concurrency)
+    judge_limit = asyncio.Semaphore(evaluator.max_concurrency)
+    executor = None
+    if not asyncio.iscoroutinefunction(model_response_fn):
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="probe")
+    loop = asyncio.get_running_loop()
+    
+    async def respond(probe: Probe) -> str:
+        async with slots:
+            if limiter is not None:
+                await limiter.acquire()
+            if executor is None:
+                return await model_response_fn(compressed_context, probe.question)
+            return await loop.run_in_executor(
+                executor, model_response_fn, compressed_context, probe.question
+            )
+    
+    async def judge(probe: Probe, response: str) -> EvaluationResult:
+        return await evaluator.evaluate_async(probe, response, compressed_context,
+                                              _limit=judge_limit)
+    
+    async def run(probe: Probe) -> EvaluationResult:
+        return await judge(probe, await respond(probe))
+    
+    try:
+        if not (warm_prefix and probes):
+            return list(await asyncio.gather(*(run(probe) for probe in probes)))
+        # Only the first model call has to finish before fanning out;
+        # its judging runs alongside the rest
+        first = await respond(probes[0])
+        return list(await asyncio.gather(
+            judge(probes[0], first), *(run(probe) for probe in probes[1:])
+        ))
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
 
 
 # Usage Example
@@ -602,7 +1629,10 @@ class StructuredSummarizer:
 def evaluate_compression_quality(
     original_history: str,
     compressed_context: str,
-    model_response_fn
+    model_response_fn,
+    max_concurrency: int = 4,
+    requests_per_second: Optional[float] = None,
+    evaluator: Optional["CompressionEvaluator"] = None
 ) -> Dict:
     """
     Evaluate compression quality for a conversation.
@@ -610,7 +1640,11 @@ def evaluate_compression_quality(
     Args:
         original_history: The full conversation before compression
         compressed_context: The compressed version
-        model_response_fn: Function to get model responses given compressed context
+        model_response_fn: Function (or coroutine function) to get model
+            responses given compressed context
+        max_concurrency: Probe responses requested at once
+        requests_per_second: Rate limit for model_response_fn calls
+        evaluator: Evaluator to use (defaults to a new CompressionEvaluator)
         
     Returns:
         Evaluation summary with scores and recommendations
@@ -619,15 +1653,14 @@ def evaluate_compression_quality(
     generator = ProbeGenerator(original_history)
     probes = generator.generate_probes()
     
-    # Evaluate each probe
-    evaluator = CompressionEvaluator()
-    
-    for probe in probes:
-        # Get model response using compressed context
-        response = model_response_fn(compressed_context, probe.question)
-        
-        # Evaluate response
-        evaluator.evaluate(probe, response, compressed_context)
+    # Collect responses concurrently and evaluate each as it arrives
+    evaluator = evaluator or CompressionEvaluator()
+    evaluator.record_compression(original_history, compressed_context)
+    _run_sync(run_probes_async(
+        probes, compressed_context, model_response_fn, evaluator,
+        max_concurrency=max_concurrency,
+        requests_per_second=requests_per_second
+    ))
     
     # Get summary
     summary = evaluator.get_summary()
@@ -637,7 +1670,8 @@ def evaluate_compression_quality(
     
     if summary.get("weakest_dimension") == "artifact_trail":
         summary["recommendations"].append(
-            "Consider implementing separate artifact tracking outside compression"
+            "Consider implementing separate artifact tracking outside compression "
+            "(artifact_index.ArtifactIndex)"
         )
     
     if summary["average_score"] < 3.5:
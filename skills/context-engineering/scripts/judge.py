@@ -0,0 +1,255 @@
+"""
+LLM Judge Backends
+
+Judge backends for CompressionEvaluator that call an OpenAI-compatible
+chat completions endpoint, plus a local stub server that answers in the
+same format for tests and benchmarks.
+
+Usage:
+    python judge.py bench [latency_seconds]
+"""
+
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from compression_evaluator import (
+    CompressionEvaluator,
+    CriterionResult,
+    JudgeBackend,
+    Probe,
+    ProbeGenerator,
+)
+
+
+JUDGE_SYSTEM_PROMPT = """You evaluate an AI agent's answer to a probe question asked after its context was compressed.
+Score each listed criterion from 0 (fails completely) to 5 (fully satisfied).
+Reply with JSON only: {"scores": [{"criterion_id": "...", "score": 0-5, "reasoning": "..."}]}
+with one entry per criterion, using the criterion ids exactly as given."""
+
+
+def format_judge_input(criteria: List[Dict],
+                       probe: Probe,
+                       response: str,
+                       context: str) -> str:
+    """Build the judge's user message for one or more criteria."""
+    lines = [
+        f"## Probe ({probe.probe_type.value})",
+        probe.question,
+        "",
+        "## Ground Truth",
+        probe.ground_truth or "Not available",
+        "",
+        "## Compressed Context",
+        context,
+        "",
+        "## Response",
+        response,
+        "",
+        "## Criteria",
+    ]
+    lines.extend(f"- {c['id']}: {c['question']}" for c in criteria)
+    return "\n".join(lines)
+
+
+def parse_judge_output(content: str, criteria: List[Dict]) -> List[CriterionResult]:
+    """Parse the judge's JSON reply into results ordered like criteria."""
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        raise ValueError(f"Judge reply is not JSON: {content[:200]!r}")
+    scores = {
+        entry["criterion_id"]: entry
+        for entry in json.loads(match.group(0)).get("scores", [])
+    }
+    results = []
+    for criterion in criteria:
+        entry = scores.get(criterion["id"])
+        if entry is None:
+            raise ValueError(f"Judge reply has no score for {criterion['id']}")
+        results.append(CriterionResult(
+            criterion_id=criterion["id"],
+            score=min(5.0, max(0.0, float(entry["score"]))),
+            reasoning=str(entry.get("reasoning", ""))
+        ))
+    return results
+
+
+class HTTPJudge(JudgeBackend):
+    """
+    Judge backed by an OpenAI-compatible /chat/completions endpoint.
+
+    Requests run on a dedicated thread pool so that up to max_workers
+    calls are in flight; the evaluator's max_concurrency should not
+    exceed it.
+    """
+
+    supports_packing = True
+
+    def __init__(self,
+                 base_url: str,
+                 model: str = "gpt-5.2",
+                 api_key: Optional[str] = None,
+                 timeout: float = 60.0,
+                 max_workers: int = 16):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="judge")
+
+    async def score(self,
+                    criteria: List[Dict],
+                    probe: Probe,
+                    response: str,
+                    context: str) -> List[CriterionResult]:
+        body = {
+            "model": self.model,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+                {"role": "user", "content": format_judge_input(criteria, probe, response, context)}
+            ]
+        }
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(self._executor, self._post, body)
+        return parse_judge_output(content, criteria)
+
+    def _post(self, body: Dict) -> str:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body).encode("utf-8"), headers=headers
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as reply:
+            data = json.loads(reply.read())
+        return data["choices"][0]["message"]["content"]
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class StubJudgeServer:
+    """
+    Local stand-in for a judge endpoint.
+
+    Answers /chat/completions after a fixed latency with a score of 3 for
+    every criterion listed in the request, so evaluation plumbing and
+    concurrency can be exercised without an API key.
+    """
+
+    _CRITERION = re.compile(r"^- ([a-z_]+):", re.MULTILINE)
+
+    def __init__(self, latency: float = 0.2, port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests += 1
+                time.sleep(server.latency)
+                user = body["messages"][-1]["content"]
+                scores = [
+                    {"criterion_id": cid, "score": 3, "reasoning": "stub"}
+                    for cid in server._CRITERION.findall(user)
+                ]
+                payload = json.dumps({
+                    "choices": [{"message": {"role": "assistant",
+                                             "content": json.dumps({"scores": scores})}}]
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # The default backlog of 5 drops connections under concurrent
+            # evaluation, stalling them for a SYN retransmit
+            request_queue_size = 128
+
+        self._httpd = Server(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubJudgeServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubJudgeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def benchmark(latency: float = 0.2) -> Dict[str, Dict]:
+    """Time serial, concurrent and packed evaluation against the stub server."""
+    history = (
+        "error: connection refused in db/pool.py\n"
+        "I read config/settings.py and modified db/pool.py\n"
+        "We decided to retry with backoff\n"
+        "next: add integration tests\n"
+    )
+    probes = ProbeGenerator(history).generate_probes()
+    response = "We modified db/pool.py to retry connections with backoff; next we add tests."
+    items = [(probe, response, history) for probe in probes]
+
+    modes = {
+        "serial": {"max_concurrency": 1},
+        "concurrent": {"max_concurrency": 16},
+        "packed": {"max_concurrency": 16, "pack_criteria": True},
+    }
+    timings = {}
+    with StubJudgeServer(latency) as server:
+        for name, options in modes.items():
+            judge = HTTPJudge(server.base_url)
+            evaluator = CompressionEvaluator(judge=judge, **options)
+            before = server.requests
+            start = time.perf_counter()
+            evaluator.evaluate_many(items)
+            timings[name] = {
+                "seconds": time.perf_counter() - start,
+                "requests": server.requests - before,
+                "average_score": evaluator.get_summary()["average_score"],
+            }
+            asyncio.run(judge.close())
+    return timings
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "bench":
+        print(__doc__)
+        sys.exit(1)
+
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    timings = benchmark(latency)
+    baseline = timings["serial"]["seconds"]
+    print(f"Judge latency {latency:.2f}s")
+    for name, stats in timings.items():
+        print(f"  {name:<11} {stats['seconds']:6.2f}s  {stats['requests']:3d} requests  "
+              f"({baseline / stats['seconds']:.1f}x)  avg score {stats['average_score']:.2f}")
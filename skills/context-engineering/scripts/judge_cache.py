@@ -0,0 +1,185 @@
+"""
+Judge Result Cache
+
+Persistent SQLite cache of judge scores keyed on the judge model, the
+criterion and content hashes of the probe, response and compressed
+context, so reruns of an evaluation suite only pay for inputs that
+changed.
+
+Usage:
+    python judge_cache.py stats <path>
+    python judge_cache.py prune <path> [ttl_seconds]
+"""
+
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS judgments (
+    key TEXT PRIMARY KEY,
+    score REAL NOT NULL,
+    reasoning TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS judgments_accessed ON judgments (accessed);
+"""
+
+# SQLite's default limit on bound parameters is 999 in older builds
+_MAX_PARAMS = 900
+
+
+def content_digest(*parts: Optional[str]) -> str:
+    """Stable digest of one or more strings (None and "" differ)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            digest.update(b"\x00")
+        else:
+            digest.update(b"\x01" + part.encode("utf-8") + b"\x1f")
+    return digest.hexdigest()
+
+
+class JudgeCache:
+    """
+    SQLite-backed cache of (score, reasoning) per judged criterion.
+
+    Entries older than ttl seconds are treated as misses and removed.
+    When more than max_entries are stored, the least recently used
+    entries are evicted. Safe to share between threads.
+    """
+
+    def __init__(self,
+                 path: str = "judge_cache.sqlite",
+                 ttl: Optional[float] = None,
+                 max_entries: int = 100_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._count = self._db.execute("SELECT COUNT(*) FROM judgments").fetchone()[0]
+
+    @staticmethod
+    def key(model: str,
+            criterion_id: str,
+            probe_digest: str,
+            response_digest: str,
+            context_digest: str) -> str:
+        """Cache key for one criterion; digests come from content_digest."""
+        return content_digest(model, criterion_id, probe_digest,
+                              response_digest, context_digest)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[float, str]]:
+        """Look up keys, returning {key: (score, reasoning)} for live hits."""
+        keys = list(keys)
+        now = time.time()
+        found = {}
+        expired = []
+        with self._lock:
+            for i in range(0, len(keys), _MAX_PARAMS):
+                chunk = keys[i:i + _MAX_PARAMS]
+                rows = self._db.execute(
+                    f"SELECT key, score, reasoning, created FROM judgments "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, score, reasoning, created in rows:
+                    if self.ttl is not None and now - created > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = (score, reasoning)
+            if found:
+                self._db.executemany(
+                    "UPDATE judgments SET accessed = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            if expired:
+                self._delete(expired)
+            self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[str, Tuple[float, str]]) -> None:
+        """Store {key: (score, reasoning)}, evicting LRU entries over the bound."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO judgments VALUES (?, ?, ?, ?, ?)",
+                [(key, score, reasoning, now, now)
+                 for key, (score, reasoning) in entries.items()]
+            )
+            self._count += self._db.total_changes - before
+            self._db.executemany(
+                "UPDATE judgments SET score = ?, reasoning = ?, created = ?, accessed = ? "
+                "WHERE key = ?",
+                [(score, reasoning, now, now, key)
+                 for key, (score, reasoning) in entries.items()]
+            )
+            if self._count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM judgments WHERE key IN "
+                    "(SELECT key FROM judgments ORDER BY accessed LIMIT ?)",
+                    (self._count - self.max_entries,)
+                )
+                self._count = self.max_entries
+            self._db.commit()
+
+    def prune(self) -> int:
+        """Remove expired entries; returns how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM judgments WHERE created < ?", (time.time() - self.ttl,)
+            )
+            self._count -= cursor.rowcount
+            self._db.commit()
+            return cursor.rowcount
+
+    def _delete(self, keys: list) -> None:
+        for i in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[i:i + _MAX_PARAMS]
+            cursor = self._db.execute(
+                f"DELETE FROM judgments WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            self._count -= cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Entry count and hit rate for this session."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("stats", "prune"):
+        print(__doc__)
+        sys.exit(1)
+
+    ttl = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    cache = JudgeCache(sys.argv[2], ttl=ttl)
+    if sys.argv[1] == "prune":
+        print(f"Removed {cache.prune()} expired entries")
+    print(cache.stats())
+    cache.close()
@@ -0,0 +1,346 @@
+"""
+Local Pre-Scoring for the LLM Judge
+
+LocalScorer estimates how much of a probe's ground truth a response
+recovers from cheap features:
+- fuzzy word overlap with the ground truth
+- recall of file paths and code identifiers
+- exact matching of numbers (status codes, counts, line numbers)
+
+CascadeJudge puts it in front of an LLM judge backend. Probes whose
+local estimate is clearly good or clearly bad are scored locally; only
+uncertain ones (and probes without ground truth) are escalated to the
+judge. A small random share of confident probes is escalated anyway; their
+local estimates are compared with the judge's scores, so calibration stats
+show how far local decisions can be trusted. Uncertain escalations are
+tracked separately to help tune the accept/reject thresholds.
+
+Usage:
+    python local_scorer.py bench [sessions] [latency_seconds]
+"""
+
+import asyncio
+import difflib
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from compression_evaluator import (
+    CompressionEvaluator,
+    CriterionResult,
+    JudgeBackend,
+    Probe,
+    ProbeGenerator,
+    normalize_path,
+)
+
+
+_WORD = re.compile(r"\w+")
+_PATH = re.compile(r"[\w./-]+\.[a-z]{1,5}\b")
+_IDENTIFIER = re.compile(r"\b(?:[a-z]\w*_\w+|[a-z]+[A-Z]\w*|[A-Z][a-z0-9]+[A-Z]\w*)\b")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_EVASIVE = re.compile(
+    r"\b(?:don'?t know|do not know|not sure|no (?:record|information)|unable to|can'?t recall|cannot recall)\b",
+    re.IGNORECASE
+)
+
+_STOPWORDS = frozenset(
+    "a an the and or of to in on for with is are was were be it this that we i "
+    "you by as at from".split()
+)
+
+# Feature weights; features the ground truth gives no material for are left out
+_WEIGHTS = {"overlap": 0.4, "paths": 0.3, "identifiers": 0.15, "numbers": 0.15}
+
+_REASONING = {
+    True: "Local pre-score: ground truth recovered.",
+    False: "Local pre-score: ground truth missing.",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class LocalEstimate:
+    """Local estimate for one probe response."""
+    score: float
+    signal: float
+    confident: bool
+    features: Dict[str, float]
+
+
+class LocalScorer:
+    """Feature-based estimate of ground-truth recovery (0-5)."""
+
+    def __init__(self,
+                 accept: float = 0.85,
+                 reject: float = 0.2,
+                 fuzzy_cutoff: float = 0.8):
+        """
+        Args:
+            accept: Signal at or above which a response is confidently good
+            reject: Signal at or below which it is confidently bad
+            fuzzy_cutoff: difflib ratio for a near-miss word to count
+        """
+        self.accept = accept
+        self.reject = reject
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+    def estimate(self, probe: Probe, response: str) -> LocalEstimate:
+        truth = probe.ground_truth
+        if not truth:
+            return LocalEstimate(2.5, 0.5, False, {})
+
+        features = {}
+        overlap = self._overlap(truth, response)
+        if overlap is not None:
+            features["overlap"] = overlap
+
+        response_paths = {normalize_path(p) for p in _PATH.findall(response)}
+        truth_paths = {normalize_path(p) for p in _PATH.findall(truth)}
+        if truth_paths:
+            features["paths"] = len(truth_paths & response_paths) / len(truth_paths)
+
+        truth_identifiers = set(_IDENTIFIER.findall(truth)) - truth_paths
+        if truth_identifiers:
+            found = set(_IDENTIFIER.findall(response))
+            features["identifiers"] = len(truth_identifiers & found) / len(truth_identifiers)
+
+        truth_numbers = set(_NUMBER.findall(truth))
+        if truth_numbers:
+            found = set(_NUMBER.findall(response))
+            features["numbers"] = len(truth_numbers & found) / len(truth_numbers)
+
+        if not features:
+            return LocalEstimate(2.5, 0.5, False, features)
+
+        total = sum(_WEIGHTS[name] for name in features)
+        signal = sum(_WEIGHTS[name] * value for name, value in features.items()) / total
+        # A wrong path or number is a wrong answer however much prose matches
+        if features.get("paths") == 0.0 or features.get("numbers") == 0.0:
+            signal = min(signal, self.reject)
+        if _EVASIVE.search(response) and signal < self.accept:
+            signal = min(signal, self.reject)
+
+        confident = signal >= self.accept or signal <= self.reject
+        return LocalEstimate(round(5.0 * signal, 2), signal, confident, features)
+
+    def _overlap(self, truth: str, response: str) -> Optional[float]:
+        """Share of ground-truth words in the response, near misses counted."""
+        wanted = [w for w in dict.fromkeys(_WORD.findall(truth.lower())) if w not in _STOPWORDS]
+        if not wanted:
+            return None
+        have = set(_WORD.findall(response.lower()))
+        candidates = None
+        hits = 0.0
+        for word in wanted:
+            if word in have:
+                hits += 1.0
+                continue
+            if candidates is None:
+                candidates = list(have)
+            close = difflib.get_close_matches(word, candidates, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                hits += difflib.SequenceMatcher(None, word, close[0]).ratio()
+        return hits / len(wanted)
+
+
+class CalibrationStats:
+    """Running agreement between local estimates and judge scores."""
+
+    def __init__(self, pass_threshold: float = 3.0):
+        self.pass_threshold = pass_threshold
+        self._criteria: Dict[str, List[float]] = {}
+
+    def add(self, criterion_id: str, local: float, judged: float) -> None:
+        # n, sum of error, sum of |error|, within one point, same pass/fail
+        stats = self._criteria.setdefault(criterion_id, [0, 0.0, 0.0, 0, 0])
+        error = local - judged
+        stats[0] += 1
+        stats[1] += error
+        stats[2] += abs(error)
+        stats[3] += abs(error) <= 1.0
+        stats[4] += (local >= self.pass_threshold) == (judged >= self.pass_threshold)
+
+    def merge(self, other: "CalibrationStats") -> None:
+        for criterion_id, stats in other._criteria.items():
+            mine = self._criteria.setdefault(criterion_id, [0, 0.0, 0.0, 0, 0])
+            for i, value in enumerate(stats):
+                mine[i] += value
+
+    @staticmethod
+    def _describe(stats: List[float]) -> Dict:
+        n = stats[0]
+        return {
+            "samples": n,
+            "bias": stats[1] / n,
+            "mean_absolute_error": stats[2] / n,
+            "within_one_point": stats[3] / n,
+            "pass_fail_agreement": stats[4] / n,
+        }
+
+    def summary(self) -> Dict:
+        if not self._criteria:
+            return {"samples": 0}
+        overall = [sum(values) for values in zip(*self._criteria.values())]
+        summary = self._describe(overall)
+        summary["criteria"] = {
+            criterion_id: self._describe(stats)
+            for criterion_id, stats in sorted(self._criteria.items())
+        }
+        return summary
+
+
+class CascadeJudge(JudgeBackend):
+    """
+    LocalScorer first, the wrapped judge only for uncertain probes.
+
+    With calibration_rate > 0 that share of confident probes is escalated
+    too (their judge scores are used) and compared in calibration;
+    uncertain probes are compared in uncertain.
+    """
+
+    supports_packing = True
+
+    def __init__(self,
+                 judge: JudgeBackend,
+                 scorer: Optional[LocalScorer] = None,
+                 calibration_rate: float = 0.05,
+                 seed: int = 0):
+        self.judge = judge
+        self.scorer = scorer or LocalScorer()
+        self.calibration_rate = calibration_rate
+        self.calibration = CalibrationStats()
+        self.uncertain = CalibrationStats()
+        self.counts = {"local": 0, "escalated": 0, "calibration": 0, "judge_calls": 0}
+        self._rng = random.Random(seed)
+
+    async def score(self,
+                    criteria: List[Dict],
+                    probe: Probe,
+                    response: str,
+                    context: str) -> List[CriterionResult]:
+        estimate = self.scorer.estimate(probe, response)
+        if estimate.confident:
+            if self._rng.random() >= self.calibration_rate:
+                self.counts["local"] += len(criteria)
+                reasoning = _REASONING[estimate.signal >= self.scorer.accept]
+                return [
+                    CriterionResult(criterion_id=c["id"], score=estimate.score, reasoning=reasoning,
+                                    local=True)
+                    for c in criteria
+                ]
+            self.counts["calibration"] += len(criteria)
+        else:
+            self.counts["escalated"] += len(criteria)
+
+        if self.judge.supports_packing or len(criteria) == 1:
+            self.counts["judge_calls"] += 1
+            results = await self.judge.score(criteria, probe, response, context)
+        else:
+            self.counts["judge_calls"] += len(criteria)
+            batches = await asyncio.gather(*(
+                self.judge.score([c], probe, response, context) for c in criteria
+            ))
+            results = [result for batch in batches for result in batch]
+        stats = self.calibration if estimate.confident else self.uncertain
+        for result in results:
+            stats.add(result.criterion_id, estimate.score, result.score)
+        return results
+
+    def identity(self) -> str:
+        """The wrapped judge's identity: only its verdicts are cached."""
+        return self.judge.identity()
+
+    def cacheable(self, result: CriterionResult) -> bool:
+        return not result.local and self.judge.cacheable(result)
+
+    def stats(self) -> Dict:
+        """Local/escalated criterion counts, judge calls and calibration."""
+        total = self.counts["local"] + self.counts["escalated"] + self.counts["calibration"]
+        stats = dict(self.counts)
+        stats["criteria"] = total
+        stats["local_rate"] = self.counts["local"] / total if total else 0.0
+        stats["calibration"] = self.calibration.summary()
+        stats["uncertain"] = self.uncertain.summary()
+        return stats
+
+    async def close(self) -> None:
+        await self.judge.close()
+
+
+class _ReferenceJudge(JudgeBackend):
+    """Benchmark stand-in for an LLM judge: slow, and strict on ground truth."""
+
+    supports_packing = True
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def score(self, criteria, probe, response, context):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        truth = probe.ground_truth or ""
+        score = 5.0 if truth and truth in response else 1.0 if truth else 3.0
+        return [CriterionResult(criterion_id=c["id"], score=score, reasoning="reference")
+                for c in criteria]
+
+
+def benchmark(sessions: int = 50, latency: float = 0.05) -> Dict[str, Dict]:
+    """Judge calls, time and score with and without the cascade."""
+    from bench_extraction import synthetic_transcript
+
+    rng = random.Random(0)
+    items = []
+    for seed in range(sessions):
+        history = synthetic_transcript(0.005, seed=seed)
+        for probe in ProbeGenerator(history).generate_probes():
+            truth = probe.ground_truth or ""
+            kind = rng.random()
+            if kind < 0.5:
+                response = f"From the earlier work: {truth}"
+            elif kind < 0.8:
+                response = "I don't know, that was compressed away."
+            else:
+                words = truth.split()
+                response = "Roughly: " + " ".join(words[:max(1, len(words) // 2)])
+            items.append((probe, response, history[-2000:]))
+
+    timings = {}
+    for name in ("judge", "cascade"):
+        reference = _ReferenceJudge(latency)
+        judge = reference if name == "judge" else CascadeJudge(reference)
+        if name == "cascade":
+            judge.calibration_rate = 0.2
+        evaluator = CompressionEvaluator(judge=judge, max_concurrency=8, pack_criteria=True)
+        start = time.perf_counter()
+        evaluator.evaluate_many(items)
+        timings[name] = {
+            "seconds": time.perf_counter() - start,
+            "judge_calls": reference.calls,
+            "average_score": evaluator.get_summary()["average_score"],
+        }
+        if name == "cascade":
+            timings[name]["stats"] = judge.stats()
+    return timings
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "bench":
+        print(__doc__)
+        sys.exit(1)
+
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    timings = benchmark(sessions, latency)
+    for name in ("judge", "cascade"):
+        row = timings[name]
+        print(f"{name:<8} {row['seconds']:6.2f}s  {row['judge_calls']:4d} judge calls  "
+              f"avg score {row['average_score']:.2f}")
+    stats = timings["cascade"]["stats"]
+    calibration = stats["calibration"]
+    print(f"local {stats['local_rate']:.0%} of criteria; calibration on {calibration['samples']} "
+          f"scores: MAE {calibration.get('mean_absolute_error', 0):.2f}, "
+          f"pass/fail agreement {calibration.get('pass_fail_agreement', 0):.0%}")
@@ -0,0 +1,153 @@
+"""
+Token Accounting
+
+Counts tokens of original and compressed contexts with a pluggable
+tokenizer and reports compression ratio, tokens saved and score per
+token, so compression strategies can be compared on what they cost.
+
+tiktoken is used when installed (and its encoding can be loaded);
+otherwise a heuristic word-piece estimate stands in. Counts are
+memoized by a digest of the text, so the same context is only
+tokenized once.
+
+Usage:
+    python token_accounting.py <original_file> <compressed_file>
+"""
+
+import hashlib
+import math
+import re
+import sys
+from collections import OrderedDict
+from typing import Dict, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+class HeuristicTokenizer:
+    """
+    Estimate BPE token counts without a vocabulary.
+
+    Words count one token per four characters (rounded up), and each
+    punctuation character counts as one token, which tracks English
+    prose and code within roughly 10-20% of cl100k/o200k.
+    """
+
+    name = "heuristic"
+    _PIECES = re.compile(r"\w+|[^\w\s]")
+
+    def count(self, text: str) -> int:
+        return sum(
+            math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == "_" else 1
+            for piece in self._PIECES.findall(text)
+        )
+
+
+class TiktokenTokenizer:
+    """Exact token counts from a tiktoken encoding."""
+
+    def __init__(self, encoding: str = "o200k_base"):
+        self.name = encoding
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class CachedTokenizer:
+    """LRU memo of token counts keyed on a digest of the text."""
+
+    def __init__(self, tokenizer, max_entries: int = 65536):
+        self.tokenizer = tokenizer
+        self.name = tokenizer.name
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[bytes, int]" = OrderedDict()
+
+    def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts.move_to_end(key)
+            return count
+        count = self.tokenizer.count(text)
+        self._counts[key] = count
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return count
+
+
+def get_tokenizer(encoding: Optional[str] = "o200k_base") -> CachedTokenizer:
+    """tiktoken encoding if available, else the heuristic, memoized."""
+    if tiktoken is not None and encoding:
+        try:
+            return CachedTokenizer(TiktokenTokenizer(encoding))
+        except Exception:
+            pass  # Unknown encoding, or the BPE file cannot be fetched offline
+    return CachedTokenizer(HeuristicTokenizer())
+
+
+class TokenAccounting:
+    """Running token totals over (original, compressed) context pairs."""
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.sessions = 0
+        self.original_tokens = 0
+        self.compressed_tokens = 0
+
+    def record(self, original: str, compressed: str) -> Dict[str, float]:
+        """Count one pair; returns its token counts and ratio."""
+        original_tokens = self.tokenizer.count(original)
+        compressed_tokens = self.tokenizer.count(compressed)
+        self.add(original_tokens, compressed_tokens)
+        return {
+            "original_tokens": original_tokens,
+            "compressed_tokens": compressed_tokens,
+            "compression_ratio": compression_ratio(original_tokens, compressed_tokens)
+        }
+
+    def add(self, original_tokens: int, compressed_tokens: int) -> None:
+        """Add counts measured elsewhere (e.g. in a worker process)."""
+        self.sessions += 1
+        self.original_tokens += original_tokens
+        self.compressed_tokens += compressed_tokens
+
+    def summary(self, average_score: Optional[float] = None) -> Dict:
+        """Totals, ratio and (given the average score) score per 1k tokens."""
+        summary = {
+            "tokenizer": self.tokenizer.name,
+            "sessions": self.sessions,
+            "original_tokens": self.original_tokens,
+            "compressed_tokens": self.compressed_tokens,
+            "tokens_saved": self.original_tokens - self.compressed_tokens,
+            "compression_ratio": compression_ratio(self.original_tokens, self.compressed_tokens)
+        }
+        if average_score is not None and self.compressed_tokens:
+            mean_tokens = self.compressed_tokens / self.sessions
+            summary["score_per_1k_tokens"] = average_score / mean_tokens * 1000
+        return summary
+
+
+def compression_ratio(original_tokens: int, compressed_tokens: int) -> float:
+    """Original size over compressed size (inf when compressed is empty)."""
+    if not compressed_tokens:
+        return float("inf") if original_tokens else 1.0
+    return original_tokens / compressed_tokens
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as f:
+        original = f.read()
+    with open(sys.argv[2], encoding="utf-8") as f:
+        compressed = f.read()
+    accounting = TokenAccounting()
+    accounting.record(original, compressed)
+    for key, value in accounting.summary().items():
+        print(f"{key}: {value}")
@@ -2,13 +2,20 @@
 """
 restart-guard: guardian.py
 Independent watchdog process. Survives gateway restart.
-Polls gateway health, sends success/failure notification.
+Waits for the running gateway to go down (process exit or its listening
+socket closing), probes the port with exponential backoff until it accepts
+connections again, then confirms health over a kept-alive HTTP connection
+(falling back to `openclaw health --json` when the gateway has no HTTP
+health endpoint) and sends success/failure notification.
 
 Spawned by restart.py via start_new_session (setsid).
 """
+import http.client
 import json
 import os
+import select
 import shutil
+import socket
 import subprocess
 import sys
 import time
@@ -21,6 +28,9 @@ def main():
     import argparse
     parser = argparse.ArgumentParser(description="Restart Guard: Guardian watchdog")
     parser.add_argument("--config", required=True, help="Path to restart-guard.yaml")
+    parser.add_argument("--trigger-file", default="",
+                        help="Created by restart.py when it triggers the restart; "
+                             "down_grace counts from then")
     args = parser.parse_args()
 
     config = load_config(args.config)
@@ -33,8 +43,10 @@ def main():
     log_path = expand(paths.get("restart_log", "~/.openclaw/net/work/restart.log"))
     oc_bin = find_openclaw(paths.get("openclaw_bin", ""))
 
-    poll_interval = int(guardian_cfg.get("poll_interval", 3))
-    timeout = int(guardian_cfg.get("timeout", 120))
+    poll_interval = float(guardian_cfg.get("poll_interval", 0.5))
+    timeout = float(guardian_cfg.get("timeout", 120))
+    restart_delay = float(gateway_cfg.get("restart_delay_ms", 2000)) / 1000
+    down_grace = float(guardian_cfg.get("down_grace", restart_delay + 10))
     diag_commands = guardian_cfg.get("diagnostics", [
         "openclaw doctor --non-interactive",
         "openclaw logs --tail 30",
@@ -45,20 +57,55 @@ def main():
 
     host = gateway_cfg.get("host", "127.0.0.1")
     port = gateway_cfg.get("port", "18789")
+    auth_env = gateway_cfg.get("auth_token_env", "GATEWAY_AUTH_TOKEN")
+    auth_token = os.environ.get(auth_env, "") or dotenv_get(auth_env)
+    health = HealthProber(host, port, guardian_cfg.get("health_path", "/health"), oc_bin,
+                          auth_token=auth_token)
+    watcher = RestartWatcher(host, port)
 
-    log(f"Guardian started. timeout={timeout}s, poll={poll_interval}s")
+    log(f"Guardian started. timeout={timeout:g}s, poll={poll_interval:g}s, "
+        f"gateway pid={watcher.pid or 'unknown'}")
 
     start_time = time.time()
+    deadline = start_time + timeout
+
+    # The old gateway keeps serving until restart.py triggers the restart
+    # (after its pre-restart notification): start the grace period there
+    grace_start = start_time
+    if args.trigger_file:
+        grace_start = wait_for_trigger(args.trigger_file, lock_path, deadline, poll_interval)
+        if grace_start is None:
+            watcher.close()
+            if not os.path.exists(lock_path):
+                log("Restart was abandoned by restart.py; exiting")
+                sys.exit(1)
+            log(f"Restart was never triggered within {timeout:g}s")
+            log_entry(log_path, "timeout", "restart never triggered")
+            notify(notif, config, oc_bin,
+                   f"❌ OpenClaw restart was never triggered ({timeout:g}s).")
+            cleanup_lock(lock_path)
+            sys.exit(1)
+        log(f"Restart triggered after {grace_start - start_time:.1f}s")
 
-    # Wait a moment for gateway to begin restart
-    time.sleep(min(5, poll_interval))
+    # Wait for the old gateway to go down, so its health isn't mistaken
+    # for the restarted one's
+    event = watcher.wait_down(min(deadline, grace_start + down_grace))
+    watcher.close()
+    if event:
+        log(f"Gateway went down ({event}) after {time.time() - start_time:.1f}s")
+    else:
+        log(f"No restart observed within {down_grace:g}s; checking health anyway")
+
+    if wait_for_port(host, port, deadline, max_delay=poll_interval):
+        log(f"Gateway port open after {time.time() - start_time:.1f}s")
 
     while True:
         elapsed = time.time() - start_time
 
         # Check if gateway is healthy
-        if check_health(oc_bin, host, port):
-            log("Gateway is healthy after restart")
+        if health.check():
+            health.close()
+            log(f"Gateway is healthy after restart ({time.time() - start_time:.1f}s, via {health.via})")
             log_entry(log_path, "ok", "gateway healthy")
             notify(notif, config, oc_bin,
                    "✅ OpenClaw restart succeeded.\nGateway is healthy and ready.")
@@ -67,13 +114,14 @@ def main():
 
         # Timeout
         if elapsed > timeout:
-            log(f"Timeout after {timeout}s")
-            log_entry(log_path, "timeout", f"gateway not healthy after {timeout}s")
+            health.close()
+            log(f"Timeout after {timeout:g}s")
+            log_entry(log_path, "timeout", f"gateway not healthy after {timeout:g}s")
 
             # Run diagnostics
             diag_output = run_diagnostics(oc_bin, diag_commands)
             msg = (
-                f"❌ OpenClaw restart timed out ({timeout}s).\n"
+                f"❌ OpenClaw restart timed out ({timeout:g}s).\n"
                 f"Gateway did not become healthy.\n\n"
                 f"Diagnostics:\n{diag_output[:1500]}"
             )
@@ -84,39 +132,208 @@ def main():
         time.sleep(poll_interval)
 
 
-def check_health(oc_bin, host, port):
+class RestartWatcher:
+    """Notices the running gateway going down.
+
+    The gateway is found through the socket listening on its port
+    (/proc/net/tcp*, Linux). Going down means its process exits, watched
+    with a pidfd where available, or the listening socket closing or being
+    replaced, which also catches in-process (SIGUSR1) restarts. Without
+    /proc, a refused TCP connection is the signal.
+    """
+
+    TICK = 0.05
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = int(port)
+        self.inodes = listener_inodes(self.port)
+        self.pid = find_socket_owner(self.inodes) if self.inodes else None
+        self._pidfd = None
+        if self.pid and hasattr(os, "pidfd_open"):
+            try:
+                self._pidfd = os.pidfd_open(self.pid)
+            except OSError:
+                pass
+
+    def wait_down(self, deadline):
+        """Reason the gateway went down, or None if it didn't before deadline."""
+        if self.inodes is not None and not self.inodes:
+            return "not listening"
+        while time.time() < deadline:
+            if self._pidfd is not None:
+                if select.select([self._pidfd], [], [], self.TICK)[0]:
+                    return f"pid {self.pid} exited"
+            else:
+                time.sleep(self.TICK)
+                if self.pid and not os.path.exists(f"/proc/{self.pid}"):
+                    return f"pid {self.pid} exited"
+            if self.inodes is None:
+                if not port_open(self.host, self.port, self.TICK):
+                    return "port closed"
+                continue
+            current = listener_inodes(self.port)
+            if not current:
+                return "port closed"
+            if current != self.inodes:
+                return "listener replaced"
+        return None
+
+    def close(self):
+        if self._pidfd is not None:
+            os.close(self._pidfd)
+            self._pidfd = None
+
+
+def listener_inodes(port):
+    """Inodes of sockets listening on port, or None without /proc/net/tcp."""
+    inodes = set()
+    found = False
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            f = open(table)
+        except OSError:
+            continue
+        found = True
+        with f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                # st 0A = LISTEN; local_address is HEXIP:HEXPORT
+                if fields[3] == "0A" and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                    inodes.add(fields[9])
+    return inodes if found else None
+
+
+def find_socket_owner(inodes):
+    """PID of a process holding one of the socket inodes, if visible."""
+    targets = {f"socket:[{inode}]" for inode in inodes}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        fd_dir = f"/proc/{entry}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                if os.readlink(f"{fd_dir}/{fd}") in targets:
+                    return int(entry)
+            except OSError:
+                pass
+    return None
+
+
+def port_open(host, port, timeout=0.5):
+    try:
+        with socket.create_connection((host, int(port)), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_port(host, port, deadline, initial_delay=0.05, max_delay=1.0):
+    """Connect until the port accepts, backing off exponentially; False on deadline."""
+    delay = initial_delay
+    while True:
+        if port_open(host, port):
+            return True
+        if time.time() + delay > deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+class HealthProber:
+    """Gateway health over one kept-alive HTTP connection.
+
+    Each check is a GET on the health path, sent with the gateway bearer
+    token if there is one; the connection is reused across polls and
+    reopened after any error, so a poll costs one round trip instead of a
+    process launch. If the gateway answers but does not serve the endpoint
+    or refuses the token (401/403/404/405/501), later checks use
+    `openclaw health --json`.
+    """
+
+    UNSUPPORTED = (401, 403, 404, 405, 501)
+
+    def __init__(self, host, port, path="/health", oc_bin=None, timeout=2.0, auth_token=None):
+        self.host = host
+        self.port = int(port)
+        self.path = path
+        self.oc_bin = oc_bin
+        self.timeout = timeout
+        self.headers = {"Connection": "keep-alive"}
+        if auth_token:
+            self.headers["Authorization"] = f"Bearer {auth_token}"
+        self.via = "http"
+        self._conn = None
+
+    def check(self):
+        if self.via == "cli":
+            return check_health(self.oc_bin)
+        status, body = self._get()
+        if status in self.UNSUPPORTED and self.oc_bin:
+            log(f"GET {self.path} returned {status}; falling back to openclaw health")
+            self.close()
+            self.via = "cli"
+            return check_health(self.oc_bin)
+        return status == 200 and health_ok(body)
+
+    def _get(self):
+        """(status, body) of one request, or (None, "") if the gateway is unreachable."""
+        while True:
+            reused = self._conn is not None
+            if not reused:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request("GET", self.path, headers=self.headers)
+                reply = self._conn.getresponse()
+                body = reply.read().decode("utf-8", "replace")
+                if reply.will_close:
+                    self.close()
+                return reply.status, body
+            except (http.client.HTTPException, OSError):
+                self.close()
+                # A kept-alive connection may have been dropped by a restart
+                # since the last poll: retry once on a fresh one
+                if not reused:
+                    return None, ""
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def health_ok(body):
+    """True if a health body is JSON with ok: true or status "ok", or exactly "ok"."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body.strip().lower() == "ok"
+    if isinstance(data, dict):
+        return data.get("ok") is True or data.get("status") == "ok"
+    return False
+
+
+def check_health(oc_bin):
     """Check gateway health via openclaw health --json."""
     if not oc_bin:
-        return check_health_curl(host, port)
+        return False
     try:
         result = subprocess.run(
             [oc_bin, "health", "--json", "--timeout", "5000"],
             capture_output=True, text=True, timeout=10,
         )
         if result.returncode == 0:
-            try:
-                data = json.loads(result.stdout)
-                return data.get("ok", False) or data.get("status") == "ok"
-            except (json.JSONDecodeError, ValueError):
-                return False
+            return health_ok(result.stdout)
         return False
     except (subprocess.TimeoutExpired, OSError):
         return False
 
 
-def check_health_curl(host, port):
-    """Fallback health check via curl."""
-    try:
-        result = subprocess.run(
-            ["curl", "-sS", "--max-time", "5",
-             f"http://{host}:{port}/health"],
-            capture_output=True, text=True, timeout=10,
-        )
-        return result.returncode == 0 and "ok" in result.stdout.lower()
-    except (subprocess.TimeoutExpired, OSError):
-        return False
-
-
 def run_diagnostics(oc_bin, commands):
     """Run diagnostic commands and collect output."""
     outputs = []
@@ -173,18 +390,40 @@ def log_entry(path, result, note):
         f.write(f"- {ts} result={result} note={note}\n")
 
 
+def wait_for_trigger(path, lock_path, deadline, poll_interval):
+    """Time the restart was triggered (trigger file created), or None if
+    restart.py gave up (lock removed) or the deadline passed first."""
+    while time.time() < deadline:
+        if os.path.exists(path):
+            try:
+                return min(os.path.getmtime(path), time.time())
+            except OSError:
+                pass
+        if not os.path.exists(lock_path):
+            return None
+        time.sleep(min(poll_interval, 0.2))
+    return None
+
+
 def cleanup_lock(lock_path):
-    try:
-        os.remove(lock_path)
-    except OSError:
-        pass
+    for path in (lock_path, lock_path + ".triggered"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
 def notify(notif_config, full_config, oc_bin, message):
     """Multi-channel notification (delegated to shared notify module)."""
     sys.path.insert(0, SCRIPT_DIR)
     from notify import notify as _notify
-    _notify(notif_config, full_config, oc_bin, message)
+    results = _notify(notif_config, full_config, oc_bin, message)
+    for channel, result in results.items():
+        status = {True: "sent", False: "failed", None: "pending"}[result["ok"]]
+        detail = f", {result['error']}" if result["error"] else ""
+        log(f"notify {channel}: {status} in {result['latency']:.2f}s "
+            f"({result['attempts']} attempts{detail})")
+    return results
 
 
 def log(msg):
@@ -2,11 +2,34 @@
 notify.py — Shared multi-channel notification for restart-guard.
 Supports: OpenClaw message tool, Telegram, Discord, Slack, generic webhook.
 All enabled channels are notified (not just one fallback).
+
+Channels are sent in parallel on daemon threads over pooled in-process
+HTTP connections, under one global deadline: a slow channel never delays
+the others, and the caller gets control back by the deadline whatever
+state the sends are in. The primary (openclaw) is tried first but gets at
+most a third of the deadline, so the fallbacks always get their turn.
+Transient failures (connection errors, timeouts, 429 and 5xx) are retried
+with backoff while the deadline allows.
+
+notify() waits for the channel threads until the deadline, so every retry
+that fits in it runs even if the caller exits right after. No retry starts
+past the deadline; an attempt still in flight then is abandoned when the
+process exits, and its channel is reported with ok=None.
 """
 
+import http.client
 import json
 import os
-import subprocess
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+# Seconds notify() may take in total, unless notification.deadline_seconds
+DEFAULT_DEADLINE = 10.0
+# Cap on a single HTTP request
+REQUEST_TIMEOUT = 10.0
+# Share of the deadline the primary may use before the fallbacks start
+PRIMARY_SHARE = 1 / 3
 
 
 def dotenv_get(key):
@@ -44,18 +67,30 @@ def notify(notif_config, full_config, oc_bin, message):
             - discord
             - slack
             - webhook
+          deadline_seconds: 10       # total time notify() may take
           # Legacy: fallback: "telegram" still works (single channel)
           telegram: { bot_token_env, chat_id }
           discord:  { webhook_url_env }
           slack:    { webhook_url_env }
           webhook:  { url_env, method, headers }
+
+    Returns {channel: {"ok", "latency", "attempts", "error"}} for every
+    channel tried; a channel still sending at the deadline has ok=None.
     """
+    budget = float(notif_config.get("deadline_seconds", DEFAULT_DEADLINE))
+    start = time.monotonic()
+    deadline = start + budget
+    results = {}
     primary = notif_config.get("primary", "openclaw")
 
-    # Try primary (openclaw message tool)
+    # Try primary (openclaw message tool); a hanging gateway may only use
+    # its share of the deadline, the rest is left for the fallbacks
     if primary == "openclaw":
-        if _notify_openclaw(notif_config, full_config, oc_bin, message):
-            return
+        request = _openclaw_request(notif_config, full_config, oc_bin, message)
+        if request:
+            results["openclaw"] = _deliver(request, start + budget * PRIMARY_SHARE, retry=False)
+            if results["openclaw"]["ok"]:
+                return results
 
     # Determine channels to notify
     channels = notif_config.get("channels", [])
@@ -65,26 +100,40 @@ def notify(notif_config, full_config, oc_bin, message):
         if fallback:
             channels = [fallback]
 
-    # Notify all enabled channels
+    # Notify all enabled channels in parallel
+    threads = []
     for ch in channels:
         ch = ch.strip().lower()
+        build = _CHANNELS.get(ch)
+        if build is None or ch in results:
+            continue
         try:
-            if ch == "telegram":
-                _notify_telegram(notif_config, message)
-            elif ch == "discord":
-                _notify_discord(notif_config, message)
-            elif ch == "slack":
-                _notify_slack(notif_config, message)
-            elif ch == "webhook":
-                _notify_webhook(notif_config, message)
-        except Exception:
-            pass
+            request = build(notif_config, message)
+        except Exception as e:
+            results[ch] = {"ok": False, "latency": 0.0, "attempts": 0, "error": str(e)}
+            continue
+        if not request:
+            continue
+        results[ch] = {"ok": None, "latency": 0.0, "attempts": 0, "error": "deadline exceeded"}
+        thread = threading.Thread(
+            target=_deliver, args=(request, deadline, True, results[ch]),
+            name=f"notify-{ch}", daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    # Snapshot: sends still running keep updating their own dicts
+    return {ch: dict(result) for ch, result in results.items()}
+
 
+# --- Channel requests: (method, url, body, headers), or None if not configured ---
 
-def _notify_openclaw(notif_config, full_config, oc_bin, message):
-    """Try sending via openclaw message tool (gateway HTTP API)."""
+def _openclaw_request(notif_config, full_config, oc_bin, message):
+    """Request for the openclaw message tool (gateway HTTP API)."""
     if not oc_bin:
-        return False
+        return None
     oc_notif = notif_config.get("openclaw", {})
     gateway_cfg = full_config.get("gateway", {})
     host = gateway_cfg.get("host", "127.0.0.1")
@@ -92,7 +141,7 @@ def _notify_openclaw(notif_config, full_config, oc_bin, message):
     auth_env = gateway_cfg.get("auth_token_env", "GATEWAY_AUTH_TOKEN")
     auth_token = _resolve_env(auth_env)
     if not auth_token:
-        return False
+        return None
 
     url = f"http://{host}:{port}/tools/invoke"
     args_obj = {"action": "send", "message": message}
@@ -104,78 +153,155 @@ def _notify_openclaw(notif_config, full_config, oc_bin, message):
         args_obj["to"] = to
 
     payload = json.dumps({"tool": "message", "args": args_obj, "sessionKey": "main"})
-    try:
-        result = subprocess.run(
-            ["curl", "-sS", "-o", "/dev/null", "-w", "%{http_code}",
-             "-H", f"Authorization: Bearer {auth_token}",
-             "-H", "Content-Type: application/json",
-             "-d", payload, url],
-            capture_output=True, text=True, timeout=10,
-        )
-        return result.stdout.strip() == "200"
-    except Exception:
-        return False
+    return ("POST", url, payload, {
+        "Authorization": f"Bearer {auth_token}",
+        "Content-Type": "application/json",
+    })
 
 
-def _notify_telegram(notif_config, message):
-    """Send via Telegram Bot API."""
+def _telegram_request(notif_config, message):
+    """Request for the Telegram Bot API."""
     tg = notif_config.get("telegram", {})
     token_env = tg.get("bot_token_env", "TELEGRAM_BOT_TOKEN")
     token = _resolve_env(token_env)
     chat_id = tg.get("chat_id", "")
     if not token or not chat_id:
-        return
-    subprocess.run(
-        ["curl", "-sS", "-X", "POST",
-         f"https://api.telegram.org/bot{token}/sendMessage",
-         "-d", f"chat_id={chat_id}",
-         "--data-urlencode", f"text={message}"],
-        capture_output=True, timeout=10,
-    )
-
-
-def _notify_discord(notif_config, message):
-    """Send via Discord webhook."""
+        return None
+    return ("POST", f"https://api.telegram.org/bot{token}/sendMessage",
+            urlencode({"chat_id": chat_id, "text": message}),
+            {"Content-Type": "application/x-www-form-urlencoded"})
+
+
+def _discord_request(notif_config, message):
+    """Request for a Discord webhook."""
     dc = notif_config.get("discord", {})
     url_env = dc.get("webhook_url_env", "DISCORD_WEBHOOK_URL")
     url = _resolve_env(url_env)
     if not url:
-        return
-    subprocess.run(
-        ["curl", "-sS", "-X", "POST", "-H", "Content-Type: application/json",
-         "-d", json.dumps({"content": message}), url],
-        capture_output=True, timeout=10,
-    )
+        return None
+    return ("POST", url, json.dumps({"content": message}),
+            {"Content-Type": "application/json"})
 
 
-def _notify_slack(notif_config, message):
-    """Send via Slack incoming webhook."""
+def _slack_request(notif_config, message):
+    """Request for a Slack incoming webhook."""
     sl = notif_config.get("slack", {})
     url_env = sl.get("webhook_url_env", "SLACK_WEBHOOK_URL")
     url = _resolve_env(url_env)
     if not url:
-        return
-    subprocess.run(
-        ["curl", "-sS", "-X", "POST", "-H", "Content-Type: application/json",
-         "-d", json.dumps({"text": message}), url],
-        capture_output=True, timeout=10,
-    )
+        return None
+    return ("POST", url, json.dumps({"text": message}),
+            {"Content-Type": "application/json"})
 
 
-def _notify_webhook(notif_config, message):
-    """Send via generic webhook (configurable URL, method, headers)."""
+def _webhook_request(notif_config, message):
+    """Request for a generic webhook (configurable URL, method, headers)."""
     wh = notif_config.get("webhook", {})
     url_env = wh.get("url_env", "RESTART_GUARD_WEBHOOK_URL")
     url = _resolve_env(url_env)
     if not url:
-        return
+        return None
     method = wh.get("method", "POST").upper()
     headers = wh.get("headers", {"Content-Type": "application/json"})
     body_template = wh.get("body_template", '{"text": "{{message}}"}')
     body = body_template.replace("{{message}}", message.replace('"', '\\"'))
+    return (method, url, body, dict(headers))
+
+
+_CHANNELS = {
+    "telegram": _telegram_request,
+    "discord": _discord_request,
+    "slack": _slack_request,
+    "webhook": _webhook_request,
+}
+
+
+# --- Delivery ---
+
+def _transient(status):
+    return status == 429 or status >= 500
+
+
+def _deliver(request, deadline, retry, result=None):
+    """Send one request, retrying transient failures until the deadline.
+
+    Fills and returns result with ok, latency (seconds until the final
+    outcome), attempts and error.
+    """
+    if result is None:
+        result = {"ok": None, "latency": 0.0, "attempts": 0, "error": ""}
+    method, url, body, headers = request
+    start = time.monotonic()
+    delay = 0.25
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            result.update(ok=False, error=result["error"] or "deadline exceeded")
+            break
+        result["attempts"] += 1
+        try:
+            status = _POOL.request(method, url, body, headers, min(remaining, REQUEST_TIMEOUT))
+        except (http.client.HTTPException, OSError, ValueError) as e:
+            status, error = None, f"{type(e).__name__}: {e}"
+        else:
+            error = f"http {status}"
+        if status is not None and 200 <= status < 300:
+            result.update(ok=True, error="")
+            break
+        result["error"] = error
+        if not retry or (status is not None and not _transient(status)) \
+                or time.monotonic() + delay >= deadline:
+            result["ok"] = False
+            break
+        time.sleep(delay)
+        delay *= 2
+    result["latency"] = time.monotonic() - start
+    return result
+
+
+class _ConnectionPool:
+    """Idle HTTP(S) connections kept per host for reuse across sends."""
+
+    def __init__(self):
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body, headers, timeout):
+        """Status of one request; the response body is read and discarded."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            if parts.scheme == "https":
+                conn = http.client.HTTPSConnection(parts.netloc, timeout=timeout)
+            elif parts.scheme == "http":
+                conn = http.client.HTTPConnection(parts.netloc, timeout=timeout)
+            else:
+                raise ValueError(f"unsupported URL scheme: {url}")
+        else:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        try:
+            conn.request(method, path, body=body.encode("utf-8") if body else None,
+                         headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            with self._lock:
+                self._idle.setdefault(key, []).append(conn)
+        return response.status
+
 
-    cmd = ["curl", "-sS", "-X", method]
-    for k, v in headers.items():
-        cmd.extend(["-H", f"{k}: {v}"])
-    cmd.extend(["-d", body, url])
-    subprocess.run(cmd, capture_output=True, timeout=10)
+_POOL = _ConnectionPool()
@@ -109,9 +109,14 @@ def main():
     # --- Spawn guardian ---
     guardian_py = os.path.join(SCRIPT_DIR, "guardian.py")
     guardian_log = os.path.join(os.path.dirname(context_path), "guardian.log")
+    # Written just before the restart is triggered: the guardian's down_grace
+    # starts there, not at its own start (the pre-restart notify comes first)
+    trigger_path = lock_path + ".triggered"
+    remove_file(trigger_path)
     guardian_cmd = [
         sys.executable, guardian_py,
         "--config", args.config,
+        "--trigger-file", trigger_path,
     ]
 
     # Fully detach guardian from this process tree
@@ -140,6 +145,8 @@ def main():
     })
 
     try:
+        with open(trigger_path, "w") as f:
+            f.write(datetime.now(timezone.utc).isoformat())
         result = subprocess.run(
             ["curl", "-sS", "-o", "/dev/null", "-w", "%{http_code}",
              "-H", f"Authorization: Bearer {auth_token}",
@@ -228,8 +235,12 @@ def count_recent_failures(log_path, window):
 
 
 def cleanup_lock(lock_path):
+    remove_file(lock_path)
+
+
+def remove_file(path):
     try:
-        os.remove(lock_path)
+        os.remove(path)
     except OSError:
         pass
 